@@ -0,0 +1,113 @@
+from datetime import datetime
+from functools import wraps
+import glob
+import gzip
+import json
+import os
+import re
+import time
+
+from core.lazy import lazy_import
+
+cfbd = lazy_import('cfbd')
+
+
+CACHE_DIR = '../build/cache/cfbd'
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+_serializer = None
+
+
+class CachedResponse:
+    # ApiClient.deserialize only looks at the raw body of the response
+
+    def __init__(self, data):
+        self.data = data
+
+
+def get_serializer():
+    global _serializer
+    if _serializer is None:
+        _serializer = cfbd.ApiClient()
+    return _serializer
+
+
+def is_completed_season(year):
+    # bowls and the playoff wrap up in January, so a season is done by February
+    now = datetime.now()
+    return (now.year, now.month) >= (year + 1, 2)
+
+
+def get_cache_key(args, kwargs):
+    parts = ([str(a) for a in args] +
+             [f'{k}={v}' for k, v in sorted(kwargs.items())])
+    key = '_'.join(parts) if len(parts) > 0 else 'all'
+    return re.sub(r'[^\w=.-]', '-', key)
+
+
+def get_ttl(args, kwargs, ttl):
+    year = args[0] if len(args) > 0 else kwargs.get('year', None)
+    if isinstance(year, int) and is_completed_season(year):
+        return None
+    return ttl
+
+
+def read_entry(fp, ttl, response_type):
+    if not os.path.exists(fp):
+        return None
+    if ttl is not None and time.time() - os.path.getmtime(fp) > ttl:
+        return None
+    with gzip.open(fp, 'rt') as infile:
+        return get_serializer().deserialize(CachedResponse(infile.read()),
+                                            response_type)
+
+
+def write_entry(fp, result):
+    os.makedirs(os.path.dirname(fp), exist_ok=True)
+    data = get_serializer().sanitize_for_serialization(result)
+    tmp = f'{fp}.{os.getpid()}.tmp'
+    with gzip.open(tmp, 'wt') as outfile:
+        json.dump(data, outfile, separators=(',', ':'))
+    os.replace(tmp, fp)
+
+
+def clear_cache(endpoint='*', year=None):
+    # the year is either the first positional argument or a year= keyword
+    # somewhere in the key
+    patterns = (['*'] if year is None else
+                [f'{year}', f'{year}_*', f'*year={year}', f'*year={year}_*'])
+    fps = set(fp for pattern in patterns
+              for fp in glob.glob(os.path.join(CACHE_DIR, endpoint, f'{pattern}.json.gz')))
+    for fp in fps:
+        os.remove(fp)
+    return len(fps)
+
+
+def persistent_cache(endpoint, response_type, ttl=6*HOUR):
+    '''
+    Stores the results of an API call on disk, keyed on the endpoint and the
+    arguments of the call.  Calls whose first argument is a completed season
+    never expire; everything else is refetched once it is older than `ttl`
+    seconds.
+    '''
+
+    def decorator(fn):
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            fp = os.path.join(CACHE_DIR, endpoint,
+                              f'{get_cache_key(args, kwargs)}.json.gz')
+            cached = read_entry(fp, get_ttl(args, kwargs, ttl), response_type)
+            if cached is not None:
+                return cached
+
+            result = fn(*args, **kwargs)
+            write_entry(fp, result)
+            return result
+
+        wrapper.clear_cache = lambda year=None: clear_cache(endpoint, year)
+        return wrapper
+
+    return decorator
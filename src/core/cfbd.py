@@ -1,91 +1,137 @@
-from core.authorize import create_client
+from core.cache import persistent_cache, clear_cache, DAY
+from core.lazy import lazy_import
+from core.logos import LogoRegistry
+from core.teams import TEAMS
+from core.season import SeasonIndex
 
-import cfbd
+cfbd = lazy_import('cfbd')
 
 
 YEAR = 2024
 
 
+class LazyApi:
+    '''
+    One of the SDK's API objects, built along with the shared client the
+    first time it is used and then stored on the class in its place.
+    '''
+
+    def __init__(self, api):
+        self.api = api
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        owner.lazy_apis = getattr(owner, 'lazy_apis', []) + [self]
+
+    def __get__(self, obj, owner):
+        api = getattr(cfbd, self.api)(owner.get_client())
+        setattr(owner, self.name, api)
+        return api
+
+
 class CFBD:
     
-    client = create_client()
-    games_api = cfbd.GamesApi(client)
-    teams_api = cfbd.TeamsApi(client)
-    rankings_api = cfbd.RankingsApi(client)
-
-    team_names = {
-            'Washington St': 'Washington State',
-            'ULM': 'Louisiana-Monroe',
-            'C Carolina': 'Coastal Carolina',
-            'SDSU': 'San Diego State',
-            'Miami (FL)': 'Miami',
-            'ULM': 'UL Monroe',
-            'Appalacian State': 'App State',
-            'NDSU': 'North Dakota State',
-            'WKU': 'Western Kentucky',
-            }
+    client = None
+    games_api = LazyApi('GamesApi')
+    teams_api = LazyApi('TeamsApi')
+    rankings_api = LazyApi('RankingsApi')
+    metrics_api = LazyApi('MetricsApi')
 
     logo_urls = {
             'Charlotte': 'https://a.espncdn.com/combiner/i?img=/i/teamlogos/ncaa/500/2429.png&h=200&w=200',
             }
 
+    season_indexes = {}
+
+    logos = LogoRegistry(lambda: CFBD.get_teams(), resolve=TEAMS.canonical,
+                         overrides=logo_urls)
+
 
     # Direct API calls
     #
     # Using persistent_cache to store the results
 
     @staticmethod
+    @persistent_cache('teams', 'list[Team]', ttl=7*DAY)
     def get_teams(*args, **kwargs):
         return CFBD.teams_api.get_teams(*args, **kwargs)
 
     @staticmethod
+    @persistent_cache('fbs_teams', 'list[Team]', ttl=7*DAY)
     def get_fbs_teams(*args, **kwargs):
         return CFBD.teams_api.get_fbs_teams(*args, **kwargs)
 
     @staticmethod
+    @persistent_cache('games', 'list[Game]')
     def get_games(*args, **kwargs):
         return CFBD.games_api.get_games(*args, **kwargs)
 
+    # scores for games in progress, kept just long enough that a game shows
+    # up as final within a minute of ending
+    @staticmethod
+    @persistent_cache('games_live', 'list[Game]', ttl=60)
+    def get_games_live(*args, **kwargs):
+        return CFBD.games_api.get_games(*args, **kwargs)
+
     @staticmethod
+    @persistent_cache('rankings', 'list[RankingWeek]')
     def get_rankings(*args, **kwargs):
         return CFBD.rankings_api.get_rankings(*args, **kwargs)
 
+    @staticmethod
+    @persistent_cache('win_probability', 'list[PlayWP]', ttl=60)
+    def get_win_probability_data(*args, **kwargs):
+        return CFBD.metrics_api.get_win_probability_data(*args, **kwargs)
+
+    @staticmethod
+    def get_client():
+        if CFBD.client is None:
+            from core.authorize import create_client
+            CFBD.client = create_client()
+        return CFBD.client
+
+    @staticmethod
+    def reset_client():
+        # drops the client and API objects so they are rebuilt on next use,
+        # e.g. in a forked worker that shouldn't reuse the parent's sockets
+        CFBD.client = None
+        for api in CFBD.lazy_apis:
+            setattr(CFBD, api.name, api)
+
+    @staticmethod
+    def clear_cache(endpoint='*', year=None):
+        return clear_cache(endpoint, year)
+
 
     # Useful methods
 
     @staticmethod
     def build_logo_dict(team_names):
-        CFBD.logo_urls = {
-                t.school: CFBD.logo_urls.get(t.school, t.logos[0] if t.logos else None)
-                for t in CFBD.get_teams()
-                }
-        return {
-                team: CFBD.logo_urls.get(CFBD.team_names.get(team, team), None)
-                for team in team_names
-                }
+        return {team: CFBD.get_logo(team) for team in team_names}
 
     @staticmethod
     def get_logo(team):
-        return CFBD.logo_urls.get(CFBD.team_names.get(team, team), None)
+        return CFBD.logos.get(team)
+
+    @staticmethod
+    def get_season_index(year, division=None):
+        key = (year, division)
+        if key not in CFBD.season_indexes:
+            kwargs = {} if division is None else {'division': division}
+            CFBD.season_indexes[key] = SeasonIndex(CFBD.get_games(year, **kwargs))
+        return CFBD.season_indexes[key]
 
     @staticmethod
     def get_team_game_by_week(team_name, year, week):
-        all_games = CFBD.get_games(year, week=week)
-        matches = [g for g in all_games
-                   if g.away_team == team_name or g.home_team == team_name]
-        return None if len(matches) == 0 else matches[0]
+        return CFBD.get_season_index(year).get_game(team_name, week)
 
     @staticmethod
     def build_prev_next_dict(team_names, year, week):
+        index = CFBD.get_season_index(year)
         games = {}
         for team_name in team_names:
-            name = CFBD.team_names.get(team_name, team_name)
-
-            if week > 1:
-                prev = CFBD.get_team_game_by_week(name, year, week-1)
-            else:
-                prev = None
-            _next = CFBD.get_team_game_by_week(name, year, week)
+            prev = index.get_game(team_name, week-1) if week > 1 else None
+            _next = index.get_game(team_name, week)
 
             games[team_name] = {'prev': prev, 'next': _next}
 
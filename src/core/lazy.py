@@ -0,0 +1,41 @@
+import importlib.util
+import sys
+
+
+class MissingModule:
+    # stands in for a module that isn't installed, so only the commands that
+    # actually use it fail
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        raise ImportError(f'{self.name} is not installed')
+
+
+def lazy_import(name):
+    '''
+    Returns a module that is only executed the first time one of its
+    attributes is used.
+    '''
+    if name in sys.modules:
+        return sys.modules[name]
+    try:
+        spec = importlib.util.find_spec(name)
+    except ImportError:
+        spec = None
+    if spec is None:
+        return MissingModule(name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    # a normal import also binds a submodule on its package, and code like
+    # asyncio reaches concurrent.futures through that attribute
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import time
+
+
+LOGO_FILE = '../build/cache/logos.json'
+MIRROR_DIR = '../build/cfb/logos'
+MIRROR_URL = '/cfb/logos'
+
+LOGO_TTL = 30 * 24 * 60 * 60
+
+
+class LogoRegistry:
+    '''
+    Logo URLs keyed by school, loaded the first time a logo is asked for and
+    saved to disk so later runs only refetch the team list every `ttl`
+    seconds.  Names are passed through `resolve` first, and `overrides`
+    always win over the URLs from the API.
+
+    Logos can also be mirrored locally under content-addressed filenames, so
+    the site can serve its own copies instead of linking to the CDN.
+    '''
+
+    def __init__(self, fetch_teams, resolve=lambda team: team, overrides={},
+                 fp=LOGO_FILE, ttl=LOGO_TTL):
+        self.fetch_teams = fetch_teams
+        self.resolve = resolve
+        self.overrides = overrides
+        self.fp = fp
+        self.ttl = ttl
+        self.use_mirror = False
+
+        self.urls = None
+        self.fetched = 0
+        self.mirrored = {}
+
+    def load(self):
+        if os.path.exists(self.fp):
+            with open(self.fp, 'r') as infile:
+                data = json.load(infile)
+            self.mirrored = data.get('mirrored', {})
+            if time.time() - data['fetched'] < self.ttl:
+                self.urls = data['urls']
+                self.fetched = data['fetched']
+                return
+        self.refresh()
+
+    def refresh(self):
+        self.urls = {t.school: t.logos[0] if t.logos else None
+                     for t in self.fetch_teams()}
+        self.fetched = time.time()
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.fp), exist_ok=True)
+        with open(self.fp, 'w') as outfile:
+            json.dump({'fetched': self.fetched, 'urls': self.urls,
+                       'mirrored': self.mirrored}, outfile)
+
+    def get_url(self, school):
+        if self.urls is None:
+            self.load()
+        return self.overrides.get(school, self.urls.get(school, None))
+
+    def get(self, team):
+        url = self.get_url(self.resolve(team))
+        if self.use_mirror and url in self.mirrored:
+            return f'{MIRROR_URL}/{self.mirrored[url]}'
+        return url
+
+    def mirror(self, session, directory=MIRROR_DIR):
+        '''
+        Downloads every logo not mirrored yet into `directory`, naming each
+        file after a hash of its contents.  Logos that fail to download are
+        skipped and tried again next time.  Returns the number downloaded.
+        '''
+        if self.urls is None:
+            self.load()
+        urls = set(self.overrides.values()) | set(self.urls.values())
+        missing = sorted(url for url in urls - set(self.mirrored) if url)
+
+        def download(url):
+            # requests' exceptions are OSErrors too, so this covers both
+            # failed requests and failed writes
+            try:
+                content = session.get(url).content
+                ext = os.path.splitext(url.split('?')[0])[1] or '.png'
+                name = hashlib.sha1(content).hexdigest()[:16] + ext
+                if not os.path.exists(os.path.join(directory, name)):
+                    with open(os.path.join(directory, name), 'wb') as outfile:
+                        outfile.write(content)
+            except OSError as e:
+                print(f'Skipping {url}: {e}')
+                return url, None
+            return url, name
+
+        os.makedirs(directory, exist_ok=True)
+        downloaded = 0
+        try:
+            for url, name in session.map(download, missing):
+                if name is not None:
+                    self.mirrored[url] = name
+                    downloaded += 1
+        finally:
+            self.save()
+        return downloaded
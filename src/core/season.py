@@ -0,0 +1,35 @@
+from core.teams import TEAMS
+
+
+class SeasonIndex:
+    '''
+    Lookup tables over a single season's games, built once so that finding a
+    team's game for a week or its full schedule doesn't require scanning every
+    game in the season.  Teams are keyed by their TEAMS id, so any spelling of
+    a team's name finds its games.
+    '''
+
+    def __init__(self, games):
+        self.games = sorted(games, key=lambda g: g.week)
+        self.by_team_week = {}
+        self.by_week = {}
+        self.schedules = {}
+
+        for game in self.games:
+            self.by_week.setdefault(game.week, []).append(game)
+            for team in TEAMS.get_ids((game.home_team, game.away_team)):
+                self.by_team_week.setdefault((team, game.week), game)
+                self.schedules.setdefault(team, []).append(game)
+
+    def get_game(self, team, week):
+        return self.by_team_week.get((TEAMS.get_id(team), week), None)
+
+    def get_schedule(self, team):
+        return self.schedules.get(TEAMS.get_id(team), [])
+
+    def get_games_for_week(self, week):
+        return self.by_week.get(week, [])
+
+    @property
+    def teams(self):
+        return [TEAMS.names[team] for team in self.schedules.keys()]
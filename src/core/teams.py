@@ -0,0 +1,95 @@
+# Teams whose names differ between sources, keyed by their CFBD name.  Every
+# other team is spelled the same everywhere and is added the first time it
+# is seen.
+TEAM_ALIASES = {
+        'Washington State': {
+            'aliases': ['Washington St'],
+            'flair': ('Washington State', 'washingtonstate'),
+            },
+        'UL Monroe': {
+            'aliases': ['ULM', 'Louisiana-Monroe'],
+            },
+        'Coastal Carolina': {
+            'aliases': ['C Carolina'],
+            },
+        'San Diego State': {
+            'aliases': ['SDSU'],
+            },
+        'Miami': {
+            'aliases': ['Miami (FL)'],
+            'flair': (None, 'miami'),
+            },
+        'App State': {
+            'aliases': ['Appalacian State', 'Appalachian State'],
+            },
+        'North Dakota State': {
+            'aliases': ['NDSU'],
+            'flair': (None, 'northdakotastate'),
+            },
+        'Western Kentucky': {
+            'aliases': ['WKU'],
+            },
+        'Texas A&M': {
+            'flair': (None, 'texasam'),
+            },
+        'UConn': {
+            'flair': (None, 'connecticut'),
+            },
+        }
+
+def get_flair_slug(name):
+    return name.lower().replace(' ', '')
+
+
+class TeamIndex:
+    '''
+    One integer id per team, shared by every spelling of its name.  The id
+    is the index into `names` (the CFBD spelling), so code can compare and
+    look up teams by id instead of by string.  Unknown names are given a new
+    id the first time they are seen.
+
+    Flair markdown is kept per spelling, since the poll posts show the name
+    the way the ballot spelled it.
+    '''
+
+    def __init__(self, teams):
+        self.names = []
+        self.ids = {}
+        self.flair_overrides = {}
+        self.flairs = {}
+
+        for name, info in teams.items():
+            team_id = self.get_id(name)
+            for alias in info.get('aliases', []):
+                self.ids[alias] = team_id
+            if 'flair' in info:
+                self.flair_overrides[team_id] = info['flair']
+
+        for spelling in list(self.ids.keys()):
+            self.get_flaired_name(spelling)
+
+    def get_id(self, name):
+        try:
+            return self.ids[name]
+        except KeyError:
+            team_id = len(self.names)
+            self.ids[name] = team_id
+            self.names.append(name)
+            return team_id
+
+    def get_ids(self, names):
+        return [self.get_id(name) for name in names]
+
+    def canonical(self, name):
+        return self.names[self.get_id(name)]
+
+    def get_flaired_name(self, name):
+        try:
+            return self.flairs[name]
+        except KeyError:
+            text, slug = self.flair_overrides.get(self.get_id(name), (None, None))
+            self.flairs[name] = f'[{text or name}](#f/{slug or get_flair_slug(name)})'
+            return self.flairs[name]
+
+
+TEAMS = TeamIndex(TEAM_ALIASES)
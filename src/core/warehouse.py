@@ -0,0 +1,256 @@
+from collections import namedtuple
+from functools import lru_cache
+import os
+import sqlite3
+
+
+WAREHOUSE = '../build/warehouse.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    season INTEGER NOT NULL,
+    week INTEGER NOT NULL,
+    season_type TEXT,
+    home_team TEXT NOT NULL,
+    home_division TEXT,
+    home_points INTEGER,
+    away_team TEXT NOT NULL,
+    away_division TEXT,
+    away_points INTEGER,
+    neutral_site INTEGER,
+    conference_game INTEGER
+);
+CREATE INDEX IF NOT EXISTS games_season_week ON games (season, week);
+CREATE INDEX IF NOT EXISTS games_home ON games (home_team, season, week);
+CREATE INDEX IF NOT EXISTS games_away ON games (away_team, season, week);
+
+CREATE VIEW IF NOT EXISTS team_results AS
+    SELECT id, season, week, home_team AS team, home_division AS division,
+           away_team AS opponent, away_division AS opponent_division,
+           home_points - away_points AS margin
+    FROM games WHERE home_points IS NOT NULL
+    UNION ALL
+    SELECT id, season, week, away_team, away_division, home_team,
+           home_division, away_points - home_points
+    FROM games WHERE home_points IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS rankings (
+    season INTEGER NOT NULL,
+    season_type TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    poll TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    school TEXT NOT NULL,
+    points INTEGER,
+    first_place_votes INTEGER,
+    PRIMARY KEY (poll, season, season_type, week, school)
+);
+CREATE INDEX IF NOT EXISTS rankings_school ON rankings (poll, school, season, week);
+
+CREATE TABLE IF NOT EXISTS voters (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    organization TEXT NOT NULL,
+    UNIQUE (name, organization)
+);
+
+CREATE TABLE IF NOT EXISTS ballots (
+    poll TEXT NOT NULL,
+    season INTEGER NOT NULL,
+    week INTEGER NOT NULL,
+    voter_id INTEGER NOT NULL REFERENCES voters (id),
+    rank INTEGER NOT NULL,
+    team TEXT NOT NULL,
+    PRIMARY KEY (poll, season, week, voter_id, rank)
+);
+CREATE INDEX IF NOT EXISTS ballots_team ON ballots (poll, team, season, week);
+
+CREATE TABLE IF NOT EXISTS voter_characteristics (
+    poll TEXT NOT NULL,
+    season INTEGER NOT NULL,
+    week INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    voter_type TEXT,
+    bold INTEGER,
+    PRIMARY KEY (poll, season, week, name)
+);
+'''
+
+
+@lru_cache(maxsize=None)
+def get_row_type(fields):
+    return namedtuple('Row', fields)
+
+
+def row_factory(cursor, row):
+    return get_row_type(tuple(c[0] for c in cursor.description))(*row)
+
+
+class Warehouse:
+    '''
+    A local SQLite copy of games, rankings, ballots, voters and voter
+    characteristics.  Rows come back as namedtuples, so games can be handed
+    to code that expects the CFBD models' attribute names.
+    '''
+
+    def __init__(self, fp=WAREHOUSE):
+        if os.path.dirname(fp):
+            os.makedirs(os.path.dirname(fp), exist_ok=True)
+        self.connection = sqlite3.connect(fp)
+        self.connection.row_factory = row_factory
+        self.connection.executescript(SCHEMA)
+
+    def query(self, sql, *params):
+        return self.connection.execute(sql, params).fetchall()
+
+    # Bulk loading
+
+    def load_games(self, games):
+        with self.connection:
+            self.connection.executemany(
+                    'INSERT OR REPLACE INTO games VALUES '
+                    '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(g.id, g.season, g.week, g.season_type,
+                      g.home_team, g.home_division, g.home_points,
+                      g.away_team, g.away_division, g.away_points,
+                      g.neutral_site, g.conference_game)
+                     for g in games])
+
+    def load_rankings(self, ranking_weeks):
+        with self.connection:
+            self.connection.executemany(
+                    'INSERT OR REPLACE INTO rankings VALUES '
+                    '(?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(r.season, r.season_type, r.week, poll.poll, rank.rank,
+                      rank.school, rank.points, rank.first_place_votes)
+                     for r in ranking_weeks
+                     for poll in r.polls
+                     for rank in poll.ranks])
+
+    def get_voter_id(self, name, organization):
+        self.connection.execute(
+                'INSERT OR IGNORE INTO voters (name, organization) VALUES (?, ?)',
+                (name, organization))
+        return self.connection.execute(
+                'SELECT id FROM voters WHERE name = ? AND organization = ?',
+                (name, organization)).fetchone().id
+
+    def load_ballots(self, poll, season, week, voters):
+        # a week is always replaced as a whole, so its rows are inserted in
+        # the order the ballots came in and get_voters can return them that
+        # way
+        with self.connection:
+            self.connection.execute(
+                    'DELETE FROM ballots WHERE poll = ? AND season = ? AND week = ?',
+                    (poll, season, week))
+            rows = []
+            for voter in voters:
+                voter_id = self.get_voter_id(voter.name, voter.organization)
+                rows += [(poll, season, week, voter_id, rank + 1, team)
+                         for rank, team in enumerate(voter.rankings)]
+            self.connection.executemany(
+                    'INSERT OR REPLACE INTO ballots VALUES (?, ?, ?, ?, ?, ?)',
+                    rows)
+
+    def load_characteristics(self, poll, season, week, characteristics):
+        with self.connection:
+            self.connection.executemany(
+                    'INSERT OR REPLACE INTO voter_characteristics VALUES '
+                    '(?, ?, ?, ?, ?, ?)',
+                    [(poll, season, week, name, voter_type, bold)
+                     for name, voter_type, bold in characteristics])
+
+    def load_ballot_store(self, poll, store):
+        for season, week in store.weeks:
+            self.load_ballots(poll, season, week, store.get_ballots(season, week))
+
+    # Queries
+
+    def get_games(self, season, division=None, played=True):
+        sql = 'SELECT * FROM games WHERE season = ?'
+        params = [season]
+        if division is not None:
+            sql += ' AND (home_division = ? OR away_division = ?)'
+            params += [division, division]
+        if played:
+            sql += ' AND home_points IS NOT NULL'
+        return self.query(sql + ' ORDER BY week, id', *params)
+
+    def get_fbs_schools(self, season):
+        return [row.team for row in self.query(
+                'SELECT DISTINCT team FROM team_results '
+                'WHERE season = ? AND division = ? ORDER BY team',
+                season, 'fbs')]
+
+    def get_last_rankings(self, start_at=1, poll='AP Top 25',
+                          first_season=2000, last_season=2024):
+        '''
+        The most recent (season, week, rank) each school was ranked in, only
+        counting weeks numbered `start_at` or later.
+        '''
+        return {row.school: [row.season, row.week, row.rank] for row in self.query(
+                'SELECT school, season, week, rank FROM ('
+                '  SELECT *, ROW_NUMBER() OVER ('
+                '    PARTITION BY school ORDER BY season DESC, week DESC'
+                '  ) AS n FROM rankings'
+                '  WHERE poll = ? AND week >= ? AND season BETWEEN ? AND ?'
+                ') WHERE n = 1',
+                poll, start_at, first_season, last_season)}
+
+    def get_records_before_games(self, season, division=None):
+        '''
+        Every played game in the season along with each team's W/L/T record
+        in the games before that week.
+        '''
+        division_filter = ('' if division is None else
+                           'AND (home_division = :division OR '
+                           'away_division = :division)')
+        sql = f'''
+            WITH season_games AS (
+                SELECT * FROM games
+                WHERE season = :season AND home_points IS NOT NULL
+                {division_filter}
+            ), results AS (
+                SELECT week, home_team AS team, home_points - away_points AS margin
+                FROM season_games
+                UNION ALL
+                SELECT week, away_team, away_points - home_points
+                FROM season_games
+            ), records AS (
+                SELECT g.id, g.home_team = r.team AS is_home,
+                       SUM(r.margin > 0) AS w, SUM(r.margin < 0) AS l,
+                       SUM(r.margin = 0) AS t
+                FROM season_games g
+                JOIN results r ON r.week < g.week
+                              AND r.team IN (g.home_team, g.away_team)
+                GROUP BY g.id, is_home
+            )
+            SELECT g.*,
+                   COALESCE(h.w, 0) AS hw, COALESCE(h.l, 0) AS hl,
+                   COALESCE(h.t, 0) AS ht,
+                   COALESCE(a.w, 0) AS aw, COALESCE(a.l, 0) AS al,
+                   COALESCE(a.t, 0) AS at
+            FROM season_games g
+            LEFT JOIN records h ON h.id = g.id AND h.is_home = 1
+            LEFT JOIN records a ON a.id = g.id AND a.is_home = 0
+            ORDER BY g.week, g.id
+        '''
+        return self.connection.execute(sql, {'season': season,
+                                             'division': division}).fetchall()
+
+    def get_voters(self, poll, season, week):
+        from polls.analysis import Voter
+
+        voters = {}
+        for row in self.query(
+                'SELECT v.name, v.organization, b.team FROM ballots b '
+                'JOIN voters v ON v.id = b.voter_id '
+                'WHERE b.poll = ? AND b.season = ? AND b.week = ? '
+                'ORDER BY b.rowid',
+                poll, season, week):
+            key = (row.name, row.organization)
+            if key not in voters:
+                voters[key] = Voter(row.name, row.organization, rankings=[])
+            voters[key].rankings.append(row.team)
+        return list(voters.values())
@@ -1,43 +1,69 @@
-from polls.appoll import scrape as ap_scrape
-from polls.rcfbpoll import scrape as rcfb_scrape
-from core.cfbd import CFBD
-from polls import analysis
-from schedule import generate
-from results import bluebloods, srs
-
-
-from tabulate import tabulate
-# import cfbd
-import requests
-import requests_cache
-from core.authorize import create_client
-from csv import DictReader
-import os
+from core.cfbd import CFBD, YEAR
+from core.lazy import lazy_import
+from core.teams import TEAMS
+from core.warehouse import Warehouse, WAREHOUSE
+
 from argparse import ArgumentParser
-from tqdm import tqdm
+from csv import DictReader, reader
+import hashlib
+import json
+import os
+
+# most commands only need a few of these, so each is loaded on first use
+ap_scrape = lazy_import('polls.appoll.scrape')
+rcfb_scrape = lazy_import('polls.rcfbpoll.scrape')
+analysis = lazy_import('polls.analysis')
+polls_session = lazy_import('polls.session')
+ballot_store = lazy_import('polls.store')
+bluebloods = lazy_import('results.bluebloods')
+groups = lazy_import('results.groups')
+rankings = lazy_import('results.rankings')
+records = lazy_import('results.records')
+srs = lazy_import('results.srs')
+wp_archive = lazy_import('winprob.archive')
+chart = lazy_import('winprob.chart')
+wp_metrics = lazy_import('winprob.metrics')
+futures = lazy_import('concurrent.futures')
+inspect = lazy_import('inspect')
+np = lazy_import('numpy')
+tabulate = lazy_import('tabulate')
+tqdm = lazy_import('tqdm')
 
 
 # HTTP request caching
 # requests_cache.install_cache('cfbd', expire_after=86400)
 
 
-CFBD_TRANSLATIONS = {
-        'Washington St': 'Washington State',
-        'ULM': 'Louisiana-Monroe',
-        'C Carolina': 'Coastal Carolina',
-        'SDSU': 'San Diego State',
-        'Miami (FL)': 'Miami',
-        'ULM': 'UL Monroe',
-        'Appalacian State': 'App State',
-        }
+ballot_stores = {}
+
 
-RCFB_TRANSLATIONS = {
-        'Washington State': 'Washington St',
-        'Louisiana-Monroe': 'ULM',
-        'Coastal Carolina': 'C Carolina',
-        'San Diego State': 'SDSU',
-        'Miami': 'Miami (FL)',
-        }
+def get_ballot_store(polltext, leaguestr='cfb'):
+    key = (leaguestr, polltext)
+    if key not in ballot_stores:
+        ballot_stores[key] = ballot_store.BallotStore(f'../build/store/{leaguestr}/{polltext}')
+    return ballot_stores[key]
+
+
+def get_warehouse_poll(polltext, leaguestr='cfb'):
+    poll = 'AP' if polltext == 'ap' else 'r/CFB'
+    return poll if leaguestr == 'cfb' else f'{poll} ({leaguestr})'
+
+
+def load_ballots(year, week, scrapefn, polltext, leaguestr='cfb', warehouse=None):
+    # with a warehouse, ballots are read from it and weeks it is missing are
+    # added to it; otherwise weeks missing from the store come from the
+    # raw.csv tree, scraping them first if needed
+    if warehouse is not None:
+        poll = get_warehouse_poll(polltext, leaguestr)
+        voters = warehouse.get_voters(poll, year, week)
+        if len(voters) > 0:
+            return voters
+    fp = f'../build/{leaguestr}/polls/{polltext}/{year}/{week}/raw.csv'
+    voters = ballot_store.get_voters_for_week(get_ballot_store(polltext, leaguestr), year, week,
+                               lambda: analysis.get_voters_for_poll(fp, scrapefn))
+    if warehouse is not None:
+        warehouse.load_ballots(poll, year, week, voters)
+    return voters
 
 
 def img(team_name):
@@ -50,6 +76,7 @@ def get_game_description(game, team):
         return '<img src="../../../../resources/bye.svg">'
 
     r = ''
+    team = TEAMS.canonical(team)
     if game.away_team == team:
         location = '<img src="../../../../resources/away.svg">'
         opponent_name = img(game.home_team)
@@ -72,7 +99,7 @@ def get_game_description(game, team):
     return r
 
 
-def get_graphic_for_week(year, week, **kwargs):
+def render_graphic_for_week(year, week, logos=None, **kwargs):
     poll = kwargs.get('poll', 'AP')
     league = kwargs.get('league', 'football')
 
@@ -84,15 +111,16 @@ def get_graphic_for_week(year, week, **kwargs):
         scrapefn = lambda: rcfb_scrape.scrape_ballots_for_poll(year, week)
         polltext = 'rcfb'
     else:
-        return ''
+        return
 
-    fp = f'../build/{leaguestr}/polls/{polltext}/{year}/{week}/raw.csv'
-    ballots = analysis.get_voters_for_poll(fp, scrapefn)
+    ballots = load_ballots(year, week, scrapefn, polltext, leaguestr,
+                           warehouse=kwargs.get('warehouse', None))
     team_names = set([t for voter in ballots for t in voter.rankings])
-    logos = CFBD.build_logo_dict(team_names)
+    if logos is None:
+        logos = CFBD.build_logo_dict(team_names)
     
     games = CFBD.build_prev_next_dict(team_names, year, week)
-    s = f'''
+    yield f'''
     <html lang="en">
     <head>
     <link rel="stylesheet" href="../../../../styles.css" />
@@ -103,68 +131,72 @@ def get_graphic_for_week(year, week, **kwargs):
     '''
 
     if week > 1:
-        s += f'<a href="../{week-1}/index.html">Previous Week</a>'
+        yield f'<a href="../{week-1}/index.html">Previous Week</a>'
     if 1 < week < 15:
-        s += ' | '
+        yield ' | '
     if week < 15:
-        s += f'<a href="../{week+1}/index.html">Next Week</a>'
-    s += '</div>'
+        yield f'<a href="../{week+1}/index.html">Next Week</a>'
+    yield '</div>'
 
-    s += analysis.create_graphic(ballots, logos=logos, games=games, **kwargs)
-    s += '</body></html>'
-    return s
+    yield from analysis.render_graphic(ballots, logos=logos, games=games, **kwargs)
+    yield '</body></html>'
+
+
+def get_graphic_for_week(year, week, **kwargs):
+    return ''.join(render_graphic_for_week(year, week, **kwargs))
 
 
 def analyze_season_ballots(year, week, **kwargs):
     poll = kwargs.get('poll', 'AP')
-    all_ballots = []
+    pollstr = 'ap' if poll == 'AP' else ('rcfb' if poll == 'r/CFB' else 'unknown')
+    season = analysis.SeasonAccumulator(f'../build/store/cfb/{pollstr}/season-{year}.json')
 
-    for wk in range(1, week + 1):
+    def get_ballots(wk):
         if poll == 'AP':
-            scrapefn = lambda: ap_scrape.scrape_ballots_for_poll(year, week)
-            pollstr = 'ap'
+            scrapefn = lambda: ap_scrape.scrape_ballots_for_poll(year, wk)
         elif poll == 'r/CFB':
-            scrapefn = lambda: rcfb_scrape.scrape_ballots_for_poll(year, week)
-            pollstr = 'rcfb'
-
-        fp = f"../build/cfb/polls/{pollstr}/{year}/{wk}/raw.csv"
-        ballots = analysis.get_voters_for_poll(fp, scrapefn)
-        analysis.analyze_poll(ballots, print_table=False, print_comment=False, all_ballots=all_ballots, **kwargs)
-        all_ballots += ballots
-
-        if wk == week:
-            return analysis.analyze_poll(ballots, print_table=False, print_comment=True, all_ballots=all_ballots)
+            scrapefn = lambda: rcfb_scrape.scrape_ballots_for_poll(year, wk)
+        return load_ballots(year, wk, scrapefn, pollstr,
+                            warehouse=kwargs.get('warehouse', None))
+
+    # only weeks that haven't been added to the running totals yet, or whose
+    # ballots have changed since, need to be analyzed before this one
+    for wk in range(1, week):
+        voters = get_ballots(wk)
+        if not season.is_current(wk, voters):
+            analysis.analyze_poll(voters, print_table=False,
+                                  print_comment=False, season=season, week=wk)
+
+    return analysis.analyze_poll(get_ballots(week), print_table=False,
+                                 print_comment=True, season=season, week=week)
+
+
+def check_bluebloods(years=range(2023, 2000, -1), weeks=range(1, 16),
+                     teams=None, table=None):
+    if teams is None:
+        teams = bluebloods.bluebloods
+    if table is None:
+        table = groups.ResultsTable.from_cfbd(years)
+    outcomes = table.get_outcomes(teams, years, weeks)
+    wins, losses, ties = groups.get_group_totals(outcomes)
 
-
-def check_bluebloods():
     print('Year,Week,W,L,T,', end='')
-    for team in bluebloods.bluebloods:
+    for team in teams:
         print(team, end=',')
-    for year in range(2023, 2000, -1):
-        games = CFBD.get_games(year)
-        for week in range(1, 16):
-            w, l, t = bluebloods.calculate_blueblood_results(year, week, games)
-            print(f"{year},{week},{len(w)},{len(l)},{len(t)},", end='')
-            for team in bluebloods.bluebloods:
-                print('W' if team in w else 'L' if team in l else
-                      'T' if team in t else '-', end=',')
+    for y, year in enumerate(years):
+        for w, week in enumerate(weeks):
+            print(f"{year},{week},{wins[y, w]},{losses[y, w]},{ties[y, w]},", end='')
+            for outcome in outcomes[y, w]:
+                print(groups.OUTCOMES[outcome], end=',')
             print()
 
 
-def get_last_ranking(start_at=1, in_rankings={}):
-    most_recent = {}
-    for year in range(2024, 1999, -1):
-        rankings = CFBD.get_rankings(year) if year not in in_rankings else in_rankings[year]
-        for ranking in sorted(rankings, key=lambda r: r.week, reverse=True):
-            if (ranking.week < start_at):
-                continue
-            ap_polls = [p for p in ranking.polls if p.poll == 'AP Top 25']
-            for poll in ap_polls:
-                for rank in poll.ranks:
-                    if rank.school not in most_recent:
-                        most_recent[rank.school] = [year, ranking.week, rank.rank]
-
-    return most_recent
+def get_last_ranking(start_at=1, history=None, warehouse=None):
+    if warehouse is not None:
+        return warehouse.get_last_rankings(start_at=start_at)
+    if history is None:
+        history = rankings.RankingsHistory.from_cfbd(2000, 2024)
+    return history.get_last_ranking(start_at=start_at)
 
 
 def save_graphic_for_week(year, week, **kwargs):
@@ -183,6 +215,162 @@ def save_graphic_for_week(year, week, **kwargs):
         outfile.write(graphic)
 
 
+SITE_POLLS = [('football', 'AP'), ('football', 'r/CFB'), ('basketball', 'AP')]
+
+
+def get_page_hash(store, index, year, week, logos={}, **options):
+    '''
+    A fingerprint of everything a week's page is built from: the ballots, the
+    games shown in the previous/next columns, the logos of the ranked teams
+    and their opponents, the render options (poll, league, show_games) and
+    the rendering code.
+    '''
+    h = hashlib.sha1()
+    voter_ids, slots = store.get_slots(year, week)
+    h.update(np.ascontiguousarray(voter_ids).tobytes())
+    h.update(np.ascontiguousarray(slots).tobytes())
+    h.update(repr([(g.id, g.home_team, g.away_team, g.home_points, g.away_points)
+                   for wk in (week - 1, week)
+                   for g in index.get_games_for_week(wk)]).encode())
+    h.update(json.dumps(logos, sort_keys=True).encode())
+    shown = [index.get_game(team, wk) for team in logos
+             for wk in (week - 1, week) if wk > 0]
+    h.update(json.dumps(sorted(set((t, CFBD.get_logo(t)) for g in shown if g is not None
+                                   for t in (g.home_team, g.away_team)))).encode())
+    h.update(json.dumps(options, sort_keys=True).encode())
+    for fn in (render_graphic_for_week, analysis.render_graphic,
+               analysis.get_graphic_header, analysis.get_game_description,
+               analysis.td, analysis.th, analysis.BallotMatrix, analysis.Team):
+        h.update(inspect.getsource(fn).encode())
+    return h.hexdigest()
+
+
+def get_site_root(league, poll):
+    leaguestr = 'cfb' if league == 'football' else 'cbb'
+    pollstr = 'ap' if poll == 'AP' else 'rcfb'
+    return f'../build/{leaguestr}/polls/{pollstr}'
+
+
+def build_page(page):
+    league, poll, year, week, logos, show_games = page
+    save_graphic_for_week(year, week, poll=poll, league=league, logos=logos,
+                          show_games=show_games)
+    return page[:4]
+
+
+def render_year_summary(year, weeks, store, poll):
+    s = [f'''
+    <html lang="en">
+    <head>
+    <link rel="stylesheet" href="../../../styles.css" />
+    </head>
+    <body>
+    <h1>{poll} Poll, {year}</h1>
+    <table>
+    <tr><th>Week</th><th>Ballots</th><th>Top 5</th></tr>
+    ''']
+    for week in weeks:
+        ballots = analysis.BallotMatrix(store.get_ballots(year, week))
+        top = [ballots.team_names[t] for t in np.argsort(-ballots.points, kind='stable')[:5]]
+        s.append(f'<tr><td><a href="{week}/index.html">Week {week}</a></td>'
+                 f'<td>{len(ballots.voters)}</td>'
+                 f'<td>{" ".join(img(t) for t in top)}</td></tr>\n')
+    s.append('</table></body></html>')
+    return ''.join(s)
+
+
+def plan_site(years, weeks=None, league=None, poll=None):
+    '''
+    Every (league, poll, year, week) page on the site.  Without `weeks` this
+    is each week already in the ballot stores; otherwise it is the given
+    weeks for one league and poll, which are scraped if they are missing.
+    '''
+    polls = SITE_POLLS if weeks is None else [(league, poll)]
+    pages = []
+    for _league, _poll in polls:
+        leaguestr = 'cfb' if _league == 'football' else 'cbb'
+        pollstr = 'ap' if _poll == 'AP' else 'rcfb'
+        store = get_ballot_store(pollstr, leaguestr)
+        for year in years:
+            if weeks is None:
+                pages += [(_league, _poll, year, wk) for y, wk in store.weeks if y == year]
+                continue
+            for week in weeks:
+                if _poll == 'AP':
+                    scrapefn = lambda: ap_scrape.scrape_ballots_for_poll(year, week, league=_league)
+                else:
+                    scrapefn = lambda: rcfb_scrape.scrape_ballots_for_poll(year, week)
+                load_ballots(year, week, scrapefn, pollstr, leaguestr)
+                pages.append((_league, _poll, year, week))
+    return pages
+
+
+def build_site(years, weeks=None, league=None, poll=None, workers=None,
+               show_games=True, force=False):
+    '''
+    Builds the weekly vote distribution pages and the per-year summaries,
+    rendering pages in a pool of worker processes.  A manifest of page hashes
+    is kept beside each poll's pages so that only pages whose ballots, games
+    or templates changed are rebuilt.
+    '''
+    pages = plan_site(years, weeks, league, poll)
+
+    # load the logo map and each season's games once, so forked workers
+    # start with them instead of refetching them for every page
+    team_names = set(t for store in ballot_stores.values() for t in store.teams)
+    logos = CFBD.build_logo_dict(team_names)
+    for year in set(page[2] for page in pages):
+        CFBD.get_season_index(year)
+
+    manifests = {}
+    stale = []
+    for league, poll, year, week in pages:
+        leaguestr = 'cfb' if league == 'football' else 'cbb'
+        pollstr = 'ap' if poll == 'AP' else 'rcfb'
+        root = get_site_root(league, poll)
+        if root not in manifests:
+            manifests[root] = {}
+            if os.path.exists(f'{root}/manifest.json'):
+                with open(f'{root}/manifest.json', 'r') as infile:
+                    manifests[root] = json.load(infile)
+
+        key = f'{year}/{week}'
+        digest = get_page_hash(get_ballot_store(pollstr, leaguestr),
+                               CFBD.get_season_index(year), year, week, logos,
+                               poll=poll, league=league, show_games=show_games)
+        if (force or manifests[root].get(key) != digest or
+                not os.path.exists(f'{root}/{key}/index.html')):
+            stale.append(((league, poll, year, week, logos, show_games), root, key, digest))
+
+    with futures.ProcessPoolExecutor(max_workers=workers,
+                                     initializer=CFBD.reset_client) as pool:
+        built = list(tqdm.tqdm(pool.map(build_page, [page for page, _, _, _ in stale]),
+                          total=len(stale)))
+
+    # summaries only change when one of their weeks did
+    summaries = set()
+    for (league, poll, year, _, _, _), root, key, digest in stale:
+        manifests[root][key] = digest
+        summaries.add((league, poll, year, root))
+    for league, poll, year, _ in pages:
+        root = get_site_root(league, poll)
+        if not os.path.exists(f'{root}/{year}/index.html'):
+            summaries.add((league, poll, year, root))
+
+    for league, poll, year, root in sorted(summaries):
+        pollstr = 'ap' if poll == 'AP' else 'rcfb'
+        store = get_ballot_store(pollstr, 'cfb' if league == 'football' else 'cbb')
+        weeks_for_year = [wk for y, wk in store.weeks if y == year]
+        with open(f'{root}/{year}/index.html', 'w') as outfile:
+            outfile.write(render_year_summary(year, weeks_for_year, store, poll))
+
+    for root, manifest in manifests.items():
+        with open(f'{root}/manifest.json', 'w') as outfile:
+            json.dump(manifest, outfile, indent=1, sort_keys=True)
+
+    return built, len(pages)
+
+
 def get_poll_link(year, week, **kwargs):
     poll = kwargs.get('poll', 'AP')
     pollstr = 'ap' if poll == 'AP' else ('rcfb' if poll == 'r/CFB' else 'unknown')
@@ -230,8 +418,10 @@ release.
     return s
 
 
-def get_results_for_team(team):
-    played = [g for g in CFBD.get_games() if g.away_points is not None]
+def get_results_for_team(team, year=YEAR):
+    team = TEAMS.canonical(team)
+    played = [g for g in CFBD.get_season_index(year).get_schedule(team)
+              if g.away_points is not None]
     home_games = [g for g in played if g.home_team == team]
     away_games = [g for g in played if g.away_team == team]
 
@@ -265,26 +455,28 @@ def print_srs_best_worst():
         print(f"{team:<20s} | ({best_rank:>3d}) {best_win:<20s} | ({worst_rank:>3d}) {worst_loss:<20s}")
 
 
-def do_ranking_things():
-    rankings = {
-            year: CFBD.get_rankings(year)
-            for year in tqdm(range(2024, 1999, -1))
-            }
+def do_ranking_things(first_season=2000, last_season=2024, warehouse=None):
+    if warehouse is not None:
+        history = rankings.RankingsHistory.from_warehouse(warehouse, first_season, last_season)
+    else:
+        history = rankings.RankingsHistory.from_cfbd(first_season, last_season)
+
+    print({year: int(history.week[history.year == year].max())
+           for year in range(last_season, first_season - 1, -1)
+           if (history.year == year).any()})
 
-    print({year: max(r.week for r in rankings[year]) for year in range(2024, 1999, -1)})
+    # every starting week at once, instead of one pass over the rankings each
+    years, _, _ = history.get_last_ranked()
+    years = np.pad(years, ((0, max(0, 18 - len(years))), (0, 0)))
+    school_ids = {school: n for n, school in enumerate(history.schools)}
 
     by_week = {}
-    for week in range(1, 18):
-        recent = get_last_ranking(start_at=week, in_rankings=rankings)
-        for team in CFBD.get_teams():
-            if team.conference not in ['Big Ten', 'SEC', 'ACC', 'Big 12', 'Pac-12']:
-                continue
-            if team.school not in by_week:
-                by_week[team.school] = []
-            if team.school in recent:
-                by_week[team.school].append(recent[team.school][0])
-            else:
-                by_week[team.school].append(0)
+    for team in CFBD.get_teams():
+        if team.conference not in ['Big Ten', 'SEC', 'ACC', 'Big 12', 'Pac-12']:
+            continue
+        s = school_ids.get(team.school, None)
+        by_week[team.school] = [0 if s is None else int(years[week, s])
+                                for week in range(1, 18)]
 
     for school, dates in by_week.items():
         print(school, end=',')
@@ -293,54 +485,37 @@ def do_ranking_things():
         print()
 
 
-def get_record_before_week(team, week, games):
-    previous_games = [g for g in games
-                      if g.week < week
-                      and (g.away_team == team or g.home_team == team)]
-    record = [0, 0, 0]
-
-    for g in previous_games:
-        if ((g.away_team == team and g.away_points > g.home_points) or 
-            (g.home_team == team and g.home_points > g.away_points)):
-            record[0] += 1
-        elif g.home_points == g.away_points:
-            record[2] += 1
-        else:
-            record[1] += 1
-    if (record[0] >= 5 and record[1] == 0):
-        game = [g for g in games if g.week == week and (g.away_team == team or
-                                                        g.home_team == team)][0]
-    return record
-
-
-def get_lopsided_matchups(year):
-    games = [g for g in CFBD.get_games(year, division='fbs') if g.away_points is not None]
-
-    lopsided_games = []
-    tabledata = []
+def get_lopsided_matchups(years, warehouse=None):
+    if warehouse is None:
+        games = records.get_games_for_years(years, division='fbs')
+        before = records.get_records_before_games(games)
+    else:
+        before = [(g, (g.hw, g.hl, g.ht), (g.aw, g.al, g.at))
+                   for year in years
+                   for g in warehouse.get_records_before_games(year, division='fbs')]
 
-    for game in games:
-        hw, hl, ht = get_record_before_week(game.home_team, game.week, games)
-        aw, al, at = get_record_before_week(game.away_team, game.week, games)
+    tabledata = {year: [] for year in years}
+    for game, (hw, hl, ht), (aw, al, at) in before:
 
 #         print(aw, al, at)
 
         if ((hw >= 5 and hl == 0 and aw == 0 and al >= 5) or
             (hw == 0 and hl >= 5 and aw >= 5 and al == 0)):
-            lopsided_games.append(game)
-            tabledata.append([game.away_team, aw, al, at,
+            tabledata[game.season].append([game.away_team, aw, al, at,
                               game.home_team, hw, hl, ht,
                               game.away_points, game.home_points,
                               'away' if game.away_points >
                               game.home_points else 'home' if
                               game.home_points > game.away_points else 'tie'])
 
-    if len(tabledata) > 0:
-        print(tabulate(tabledata,
-                       ['Away', 'aW', 'aL', 'aT',
-                        'Home', 'hW', 'hL', 'hT',
-                        'aPts', 'hPts', 'Winner']))
-        print()
+    for year in years:
+        print(f'# YEAR: {year}')
+        if len(tabledata[year]) > 0:
+            print(tabulate.tabulate(tabledata[year],
+                           ['Away', 'aW', 'aL', 'aT',
+                            'Home', 'hW', 'hL', 'hT',
+                            'aPts', 'hPts', 'Winner']))
+            print()
 
 
 def get_table(rowfn, items, headers, **kwargs):
@@ -356,16 +531,303 @@ def get_table(rowfn, items, headers, **kwargs):
         _rowfn = rowfn
         _headers = headers
 
-    return tabulate([_rowfn(item) for item in _items],
+    return tabulate.tabulate([_rowfn(item) for item in _items],
                     _headers,
                     **kwargs)
 
 
-if __name__ == '__main__':
+COMMANDS = {}
+SCRAPING = {}
+
+
+def command(name, scrapes=None):
+    # registers a CLI command; commands take the parsed arguments and the
+    # selected years and weeks.  `scrapes` is True for commands that may
+    # scrape the selected poll, or the one poll a command always scrapes
+    def register(fn):
+        COMMANDS[name] = fn
+        if scrapes is not None:
+            SCRAPING[name] = scrapes
+        return fn
+    return register
+
+
+def get_scraper(args, poll=None):
+    return ap_scrape if (poll or args.poll) == 'AP' else rcfb_scrape
+
+
+def configure_scraper(args, poll=None):
+    scraper = get_scraper(args, poll)
+    if args.concurrency:
+        if scraper is rcfb_scrape:
+            rcfb_scrape.configure_session(concurrency=args.concurrency)
+        else:
+            ap_scrape.concurrency = args.concurrency
+    if args.parser:
+        scraper.parser = args.parser
+
+
+def get_scrapefn(args, year, week):
+    return lambda: get_scraper(args).scrape_ballots_for_poll(year, week)
+
+
+def get_warehouse(args):
+    return Warehouse(args.warehouse) if args.warehouse else None
+
+
+def get_polltext(args):
+    return 'ap' if args.poll == 'AP' else 'rcfb'
+
+
+def get_leaguestr(args):
+    return 'cfb' if args.league == 'football' else 'cbb' if args.league == 'basketball' else 'unknown'
+
+
+@command('check-bluebloods')
+def run_check_bluebloods(args, years, weeks):
+    check_bluebloods()
+
+
+@command('group-results')
+def run_group_results(args, years, weeks):
+    table = groups.ResultsTable.from_cfbd(years)
+    for name in args.group:
+        print(f'# {name}')
+        check_bluebloods(years, weeks, groups.get_group(name), table)
+
+
+@command('print-srs')
+def run_print_srs(args, years, weeks):
+    print_srs_best_worst()
+
+
+@command('scrape-characteristics', scrapes='r/CFB')
+def run_scrape_characteristics(args, years, weeks):
+    for year in years:
+        rcfb_scrape.scrape_characteristics_for_year(year)
+
+
+@command('create-graphic', scrapes=True)
+def run_create_graphic(args, years, weeks):
+    warehouse = get_warehouse(args)
+    for year in years:
+        for week in weeks:
+            save_graphic_for_week(year, week, poll=args.poll, league=args.league,
+                                  show_games=not args.hide_games, warehouse=warehouse)
+
+
+@command('build-site', scrapes=True)
+def run_build_site(args, years, weeks):
+    built, planned = build_site(years, weeks if args.start_week else None,
+                                league=args.league, poll=args.poll,
+                                workers=args.workers,
+                                show_games=not args.hide_games,
+                                force=args.force)
+    print(f'Rebuilt {len(built)} of {planned} pages')
+
+
+@command('mirror-logos')
+def run_mirror_logos(args, years, weeks):
+    scrape_session = polls_session.ScrapeSession(concurrency=args.concurrency or 4)
+    print(f'Downloaded {CFBD.logos.mirror(scrape_session)} logos')
+
+
+@command('debug-graphic', scrapes=True)
+def run_debug_graphic(args, years, weeks):
+    for year in years:
+        for week in weeks:
+            get_graphic_for_week(year, week, poll=args.poll, league=args.league, show_games=not args.hide_games)
+
+
+@command('create-post')
+def run_create_post(args, years, weeks):
+    for year in years:
+        for week in weeks:
+            print(create_post_for_week(year, week, poll=args.poll))
+
+
+@command('create-comment', scrapes=True)
+def run_create_comment(args, years, weeks):
+    warehouse = get_warehouse(args)
+    for year in years:
+        for week in weeks:
+            print(analyze_season_ballots(year, week, poll=args.poll,
+                                         warehouse=warehouse))
+
+
+@command('scrape', scrapes=True)
+def run_scrape(args, years, weeks):
+    scraper = get_scraper(args)
+    for year in years:
+        for week in weeks:
+            scraper.scrape_ballots_for_poll(year, week, source=args.source)
+
+
+@command('smith-sets', scrapes=True)
+def run_smith_sets(args, years, weeks):
+    warehouse = get_warehouse(args)
+    sets = []
+    for year in years:
+        for week in weeks:
+            voters = load_ballots(year, week, get_scrapefn(args, year, week), get_polltext(args),
+                                  warehouse=warehouse)
+            smith_sets = analysis.get_smith_sets(voters)
+            sets.append(smith_sets)
+
+    print(get_table(
+        lambda x: [' '.join([analysis.get_flaired_name(e) for e in ss])
+                   for ss in x],
+        [[ss[n] if n < len(ss) else [] for ss in sets] for n in range(max(len(w) for w in sets))],
+        [x+1 for x in range(len(sets))]))
+
+
+@command('srs')
+def run_srs(args, years, weeks):
+    warehouse = get_warehouse(args)
+    for year in years:
+        if args.predefined:
+            ratings = srs.get_srs_variants(year, [(0, 999), (7, 24), (0, 1)],
+                                           normalized=args.normalized,
+                                           include_fcs=args.include_fcs,
+                                           warehouse=warehouse)
+            print(get_table(lambda x: [x[0], *x[1]],
+                            sorted(ratings.items(), key=lambda x: x[1][1], reverse=True),
+                            ['Team', 'SRS', 'cfb-ref SRS', 'W/L Only']))
+        elif args.max_margins:
+            ratings = srs.get_srs_variants(year, [(args.min_margin, m)
+                                                  for m in args.max_margins],
+                                           normalized=args.normalized,
+                                           include_fcs=args.include_fcs,
+                                           warehouse=warehouse)
+            print(get_table(lambda x: [x[0], *x[1]],
+                            sorted(ratings.items(), key=lambda x: x[1][-1], reverse=True),
+                            ['Team'] + [f'Max {m}' for m in args.max_margins]))
+        else:
+            ratings = srs.get_srs(year, max_margin=args.max_margin,
+                                  min_margin=args.min_margin,
+                                  normalized=args.normalized,
+                                  include_fcs=args.include_fcs,
+                                  warehouse=warehouse)
+            print(get_table(lambda x: [x[0], x[1]],
+                            sorted(ratings.items(), key=lambda x: x[1], reverse=True),
+                            ['Team', 'SRS']))
+
+
+@command('srs-history')
+def run_srs_history(args, years, weeks):
+    if args.predefined:
+        variants = [(0, 999), (7, 24), (0, 1)]
+    elif args.max_margins:
+        variants = [(args.min_margin, m) for m in args.max_margins]
+    else:
+        variants = [(args.min_margin, args.max_margin)]
+
+    results = []
+    for year, ratings in srs.get_srs_for_years(years, variants,
+                                               workers=args.workers,
+                                               include_fcs=args.include_fcs,
+                                               normalized=args.normalized):
+        print(f'Finished {year} ({len(ratings)} teams)')
+        results.append((year, ratings))
+
+    srs.save_srs_history(args.output, sorted(results, key=lambda r: r[0]),
+                          variants)
+    print(f'Saved {len(results)} seasons to {args.output}')
+
+
+@command('import-ballots')
+def run_import_ballots(args, years, weeks):
+    leaguestr = get_leaguestr(args)
+    polltext = get_polltext(args)
+    store = get_ballot_store(polltext, leaguestr)
+    count = ballot_store.import_csv_tree(f'../build/{leaguestr}/polls/{polltext}', store)
+    print(f'Imported {count} weeks ({len(store.weeks)} in store)')
+
+
+@command('load-warehouse')
+def run_load_warehouse(args, years, weeks):
+    warehouse = get_warehouse(args) or Warehouse()
+    leaguestr = get_leaguestr(args)
+    polltext = get_polltext(args)
+    for year in years:
+        warehouse.load_games(CFBD.get_games(year))
+        warehouse.load_rankings(CFBD.get_rankings(year))
+        print(f'Loaded games and rankings for {year}')
+    poll = get_warehouse_poll(polltext, leaguestr)
+    warehouse.load_ballot_store(poll, get_ballot_store(polltext, leaguestr))
+    for year in years:
+        for week in weeks:
+            fp = f'../build/{leaguestr}/polls/{polltext}/{year}/{week}/characteristics.csv'
+            if os.path.exists(fp):
+                with open(fp, 'r') as infile:
+                    warehouse.load_characteristics(
+                            poll, year, week,
+                            [(name, voter_type or None, bold == 'True' if bold else None)
+                             for name, voter_type, bold in reader(infile)])
+
+
+@command('last-ranked')
+def run_last_ranked(args, years, weeks):
+    do_ranking_things(min(years), max(years), warehouse=get_warehouse(args))
+
+
+@command('lopsided')
+def run_lopsided(args, years, weeks):
+    get_lopsided_matchups(years, warehouse=get_warehouse(args))
+
+
+@command('clear-cache')
+def run_clear_cache(args, years, weeks):
+    for year in [None] if args.all_years else years:
+        removed = CFBD.clear_cache(args.endpoint, year)
+        print(f'Removed {removed} cached responses')
+
+
+@command('winprob-charts')
+def run_winprob_charts(args, years, weeks):
+    if args.games:
+        slates = [(args.games, chart.CHART_DIR, None)]
+    else:
+        slates = [(chart.get_slate(year, week), f'{chart.CHART_DIR}/{year}/{week}',
+                   wp_archive.WinProbArchive(wp_archive.get_archive_path(year)))
+                  for year in years for week in weeks]
+    for game_ids, directory, archive in slates:
+        for game_id, fp in chart.chart_games(game_ids, directory, fmt=args.format,
+                                             workers=args.workers,
+                                             concurrency=args.concurrency or 8,
+                                             archive=archive):
+            print(fp)
+
+
+@command('archive-winprob')
+def run_archive_winprob(args, years, weeks):
+    for year in years:
+        archive, added = wp_archive.archive_season(year, concurrency=args.concurrency or 8)
+        print(f'{year}: added {added} games, {len(archive)} archived')
+
+
+@command('winprob-metrics')
+def run_winprob_metrics(args, years, weeks):
+    ranked = wp_metrics.rank_games(wp_metrics.get_metrics_for_years(years),
+                                   by=args.sort, count=args.count)
+    print(get_table(lambda g: [g['title'], f"{g['excitement']:.2f}", g['changes'],
+                               f"{g['comeback']:.1%}", f"{g['control']:.1%}"],
+                    ranked,
+                    ['Game', 'Excitement', 'Lead Changes', 'Comeback', 'Control']))
+
+
+@command('debug')
+def run_debug(args, years, weeks):
+    for year in years:
+        for week in weeks:
+            print(f'Year: {year:>4d}   Week: {week:>2d}')
+
+
+def get_parser():
     parser = ArgumentParser(prog='CFB Python Tools',
                             description='A suite of tools for use with NCAA football data')
 
-    parser.add_argument('command')
+    parser.add_argument('command', choices=sorted(COMMANDS.keys()))
 
     parser.add_argument('-y', '--year', type=int, default=2024)
     parser.add_argument('--start-year', type=int)
@@ -376,115 +838,56 @@ if __name__ == '__main__':
     parser.add_argument('--end-week', type=int)
 
     parser.add_argument('-l', '--league', default='football')
-    parser.add_argument('-p', '--poll', default='AP')
+    parser.add_argument('-p', '--poll', default='AP', choices=['AP', 'r/CFB'])
     parser.add_argument('-s', '--source', default='CPT')
+    parser.add_argument('--concurrency', type=int)
+    parser.add_argument('--parser', choices=['html.parser', 'lxml', 'strained'])
 
     parser.add_argument('--hide-games', action='store_true')
+    parser.add_argument('--force', action='store_true')
+    parser.add_argument('--local-logos', action='store_true')
+    parser.add_argument('-g', '--group', nargs='+', default=['bluebloods'])
+    parser.add_argument('--games', type=int, nargs='+')
+    parser.add_argument('--format', choices=['png', 'svg'], default='png')
+    parser.add_argument('--sort', choices=['excitement', 'changes', 'comeback', 'control'],
+                        default='excitement')
+    parser.add_argument('--count', type=int, default=25)
+
+    parser.add_argument('--endpoint', default='*')
+    parser.add_argument('--all-years', action='store_true')
 
     parser.add_argument('--predefined', action='store_true')
     parser.add_argument('--max-margin', type=int, default=999)
     parser.add_argument('--min-margin', type=int, default=0)
+    parser.add_argument('--max-margins', type=int, nargs='+')
     parser.add_argument('--normalized', action='store_true')
     parser.add_argument('--include-fcs', action='store_true')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('-o', '--output', default='../build/srs.npz')
+    parser.add_argument('--warehouse', nargs='?', const=WAREHOUSE)
 
-    args = parser.parse_args()
+    return parser
 
-    if args.poll == 'AP':
-        scraper = ap_scrape
-        scrapefn = lambda: ap_scrape.scrape_ballots_for_poll(year, week)
-        polltext = 'ap'
-    elif args.poll == 'r/CFB':
-        scraper = rcfb_scrape
-        scrapefn = lambda: rcfb_scrape.scrape_ballots_for_poll(year, week)
-        polltext = 'rcfb'
-    else:
-        parser.error('Unknown poll specified.')
 
-    # do stuff
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+
+    if args.local_logos:
+        CFBD.logos.use_mirror = True
+    if args.command in SCRAPING and (args.concurrency or args.parser):
+        scrapes = SCRAPING[args.command]
+        configure_scraper(args, None if scrapes is True else scrapes)
+
     year_del = -1 if args.start_year and args.start_year > args.end_year else 1
     years = range(args.start_year, args.end_year + year_del, year_del) if args.start_year else [args.year]
     week_del = -1 if args.start_week and args.start_week > args.end_week else 1
     weeks = range(args.start_week, args.end_week + week_del, week_del) if args.start_week else [args.week]
 
-    if args.command == 'check-bluebloods':
-        check_bluebloods()
-
-    elif args.command == 'print-srs':
-        print_srs_best_worst()
-
-    elif args.command == 'scrape-characteristics':
-        for year in years:
-            rcfb_scrape.scrape_characteristics_for_year(year)
-
-    elif args.command == 'create-graphic':
-        for year in years:
-            for week in weeks:
-                save_graphic_for_week(year, week, poll=args.poll, league=args.league, show_games=not args.hide_games)
-
-    elif args.command == 'debug-graphic':
-        for year in years:
-            for week in weeks:
-                get_graphic_for_week(year, week, poll=args.poll, league=args.league, show_games=not args.hide_games)
-
-    elif args.command == 'create-post':
-        for year in years:
-            for week in weeks:
-                print(create_post_for_week(year, week, poll=args.poll))
-
-    elif args.command == 'create-comment':
-        for year in years:
-            for week in weeks:
-                print(analyze_season_ballots(year, week, poll=args.poll))
-
-    elif args.command == 'scrape':
-        for year in years:
-            for week in weeks:
-                scraper.scrape_ballots_for_poll(year, week, source=args.source)
+    COMMANDS[args.command](args, years, weeks)
 
-    elif args.command == 'smith-sets':
-        sets = []
-        for year in years:
-            for week in weeks:
-                fp = f'../build/cfb/polls/{polltext}/{year}/{week}/raw.csv'
-                voters = analysis.get_voters_for_poll(fp, scrapefn)
-                smith_sets = analysis.get_smith_sets(voters)
-                sets.append(smith_sets)
-
-        print(get_table(
-            lambda x: [' '.join([analysis.get_flaired_name(e) for e in ss])
-                       for ss in x],
-            [[ss[n] if n < len(ss) else [] for ss in sets] for n in range(max(len(w) for w in sets))],
-            [x+1 for x in range(len(sets))]))
-
-    elif args.command == 'srs':
-        for year in years:
-            if args.predefined:
-                ratings = srs.get_srs(year, normalized=args.normalized,
-                                      include_fcs=args.include_fcs)
-                cfbref = srs.get_srs(year, max_margin=24, min_margin=7,
-                                     normalized=args.normalized,
-                                     include_fcs=args.include_fcs)
-                wl = srs.get_srs(year, max_margin=1, normalized=args.normalized,
-                                 include_fcs=args.include_fcs)
-                print(get_table(lambda x: [x[0], ratings[x[0]], x[1], wl[x[0]]],
-                                sorted(cfbref.items(), key=lambda x: x[1], reverse=True),
-                                ['Team', 'SRS', 'cfb-ref SRS', 'W/L Only']))
-            else:
-                ratings = srs.get_srs(year, max_margin=args.max_margin,
-                                      min_margin=args.min_margin,
-                                      normalized=args.normalized,
-                                      include_fcs=args.include_fcs)
-                print(get_table(lambda x: [x[0], x[1]],
-                                sorted(ratings.items(), key=lambda x: x[1], reverse=True),
-                                ['Team', 'SRS']))
-
-    elif args.command == 'debug':
-        for year in years:
-            for week in weeks:
-                print(f'Year: {year:>4d}   Week: {week:>2d}')
 
-    else:
-        parser.error('Unknown command.')
+if __name__ == '__main__':
+    main()
 
         
 # for year in range(2023, 2010, -1):
@@ -515,9 +918,7 @@ if __name__ == '__main__':
 #     print(f'YEAR: {year}\n')
 #     rcfb_scrape.scrape_polls_for_year(year)
 
-# for year in range(1980, 1920, -1):
-#     print(f'# YEAR: {year}')
-#     get_lopsided_matchups(year)
+# get_lopsided_matchups(range(1980, 1920, -1))
 
 # TEMP
 # ballots = analysis.get_voters_for_poll(f'polls/appoll/results/2024/week9.csv',
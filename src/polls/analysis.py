@@ -1,11 +1,16 @@
 from core.cfbd import CFBD
+from core.teams import TEAMS
 from reddit import get_flaired_name
 
 from csv import reader, writer
+import hashlib
 from math import sqrt
+import json
 from os.path import exists
 import os
 
+import numpy as np
+
 from tabulate import tabulate
 from tqdm import tqdm
 
@@ -39,9 +44,10 @@ class Voter:
 
     def get_unusualness_score(self, teams, top25):
         total_score = 0
+        by_name = {team.name: team for team in teams}
 
         for r, team_name in enumerate(self.rankings):
-            team = [t for t in teams if t.name == team_name][0]
+            team = by_name[team_name]
             total_score += abs(get_vote_unusualness(r+1, team))
 
         for team in top25:
@@ -63,47 +69,192 @@ class Voter:
         return Voter(line[0], line[1], rankings=line[2:])
 
 
+class BallotMatrix:
+    '''
+    Integer-encoded view of a poll's ballots.  `ranks` is a (voters x teams)
+    array holding the position each voter gave each team, with 26 meaning the
+    team was left off of the ballot.
+    '''
+
+    def __init__(self, voters):
+        self.voters = voters
+        self.team_names = list(dict.fromkeys(team for voter in voters
+                                             for team in voter.rankings))
+        self.team_ids = {name: n for n, name in enumerate(self.team_names)}
+
+        self.ranks = np.full((len(voters), len(self.team_names)), 26,
+                             dtype=np.uint8)
+        # slots[v, p] is the team voter v put at position p + 1, -1 if empty
+        self.slots = np.full((len(voters), max([25] + [len(v.rankings)
+                                                       for v in voters])),
+                             -1, dtype=np.int32)
+        for v, voter in enumerate(voters):
+            ids = [self.team_ids[team] for team in voter.rankings]
+            # a team listed twice keeps its first (highest) position
+            self.ranks[v, ids[::-1]] = np.arange(len(ids), 0, -1)
+            self.slots[v, :len(ids)] = ids
+
+        voted = self.ranks != 26
+        self.voter_count = len(voters)
+        self.vote_count = voted.sum(axis=0)
+        self.points = (26 - self.ranks.astype(int)).sum(axis=0)
+        self.ppv = self.points / self.voter_count
+
+        real = np.where(voted, self.ranks, 0)
+        self.mean_rank = real.sum(axis=0) / self.vote_count
+        self.std_dev = np.sqrt(np.where(voted, (real - self.mean_rank) ** 2,
+                                        0).sum(axis=0) / self.vote_count)
+        self.rstd = np.maximum(1, (self.std_dev * self.vote_count + self.ppv *
+                                   (self.voter_count - self.vote_count)) /
+                               self.voter_count)
+
+        # histograms[t, p] is the number of voters who put team t at position p
+        offsets = 27 * np.arange(len(self.team_names))
+        self.histograms = np.bincount(
+                (self.ranks.astype(int) + offsets).ravel(),
+                minlength=27 * len(self.team_names)
+                ).reshape(len(self.team_names), 27)
+
+        # position in the poll, with tied teams sharing the higher rank
+        self.poll_ranks = 1 + (self.points[None, :] >
+                               self.points[:, None]).sum(axis=1)
+
+        self.teams = [Team(name, ballots=self) for name in self.team_names]
+
+    def get_team(self, name):
+        return self.teams[self.team_ids[name]]
+
+    def get_cell_voters(self):
+        '''
+        cell_voters[t][p] lists the voters who put team t in slot p (26 for
+        leaving it off), found with one sort over the ballot slots.
+        '''
+        team_count = len(self.team_names)
+        slots = self.slots[:, :25]
+        listed = slots >= 0
+        unranked = self.ranks == 26
+
+        keys = np.concatenate([
+                (27 * slots + np.arange(1, 26))[listed],
+                (27 * np.arange(team_count) + 26)[np.nonzero(unranked)[1]]])
+        owners = np.concatenate([np.nonzero(listed)[0],
+                                 np.nonzero(unranked)[0]])
+        order = np.argsort(keys, kind='stable')
+        owners = owners[order]
+        bounds = np.concatenate([[0], np.cumsum(
+                np.bincount(keys, minlength=27 * team_count))])
+        return [[[self.voters[v] for v in
+                  owners[bounds[27 * t + p]:bounds[27 * t + p + 1]]]
+                 for p in range(27)]
+                for t in range(team_count)]
+
+    def get_vote_unusualness(self):
+        '''
+        Vectorized get_vote_unusualness for every vote on every ballot, as a
+        (voters x slots) array with NaN for empty slots.
+        '''
+        filled = self.slots >= 0
+        ids = np.where(filled, self.slots, 0)
+        points = 25 - np.arange(self.slots.shape[1])
+        z = (points[None, :] - self.ppv[ids]) / self.rstd[ids]
+        u = np.where(z > 0, np.maximum(0, z - 0.75), np.minimum(0, z + 0.75))
+        return np.where(filled, u, np.nan)
+
+    def get_exclusion_unusualness(self, team_ids):
+        '''
+        Vectorized get_exclusion_unusualness, as a (voters x teams) array
+        that is zero wherever the voter did rank the team.
+        '''
+        penalty = np.maximum(0, self.ppv[team_ids] / self.rstd[team_ids] - 0.75)
+        return np.where(self.ranks[:, team_ids] == 26, penalty[None, :], 0)
+
+    def get_unusualness_scores(self, team_ids):
+        votes = self.get_vote_unusualness()
+        excluded = self.get_exclusion_unusualness(team_ids)
+        return np.nansum(np.abs(votes), axis=1) + excluded.sum(axis=1)
+
+    def get_outliers(self, team_ids, order, count=5):
+        '''
+        The `count` single votes (including exclusions from the teams in
+        `team_ids`) with the largest absolute unusualness.  Ties are broken by
+        the voter's place in `order`, then by position.
+        '''
+        votes = self.get_vote_unusualness()
+        excluded = self.get_exclusion_unusualness(team_ids)
+        u = np.concatenate([votes, excluded], axis=1)[order]
+        key = np.abs(u)
+        key[np.isnan(u)] = -1
+        key[:, votes.shape[1]:][excluded[order] <= 0] = -1
+
+        flat = np.argsort(-key.ravel(), kind='stable')[:count]
+        outliers = []
+        for v, c in zip(*np.unravel_index(flat, key.shape)):
+            if key[v, c] < 0:
+                break
+            is_vote = c < votes.shape[1]
+            outliers.append({
+                'voter': self.voters[order[v]],
+                'position': int(c) + 1 if is_vote else 'NR',
+                'team': self.teams[self.slots[order[v], c] if is_vote
+                                   else team_ids[c - votes.shape[1]]],
+                'u': float(u[v, c])
+                })
+        return outliers
+
+    def get_zscores(self, team_id):
+        positions = np.nonzero(self.histograms[team_id, 1:26])[0] + 1
+        sigma = self.std_dev[team_id]
+        if sigma == 0:
+            return {int(p): 0 for p in positions}
+        return {int(p): (p - self.mean_rank[team_id]) / sigma
+                for p in positions}
+
+
 class Team:
 
-    def __init__(self, name, voters=[]):
+    def __init__(self, name, voters=[], ballots=None):
         self.name = name
-        self.votes = [v.rankings.index(name) + 1 if name in v.rankings else 26
-                      for v in voters]
-        self.voter_count = len(voters)
+        self.ballots = BallotMatrix(voters) if ballots is None else ballots
+        self.id = self.ballots.team_ids[name]
 
     def __repr__(self):
         return self.name
 
+    @property
+    def votes(self):
+        return [int(v) for v in self.ballots.ranks[:, self.id]]
+
+    @property
+    def voter_count(self):
+        return self.ballots.voter_count
+
     @property
     def vote_count(self):
-        return len([v for v in self.votes if v != 26])
+        return int(self.ballots.vote_count[self.id])
 
     @property
     def points(self):
-        return sum(26 - vote for vote in self.votes)
+        return int(self.ballots.points[self.id])
 
     @property
     def ppv(self):
-        return self.points / self.voter_count
+        return float(self.ballots.ppv[self.id])
 
     @property
     def std_dev(self):
-        return std([vote for vote in self.votes if vote != 26])
+        return float(self.ballots.std_dev[self.id])
 
     @property
     def rstd(self):
-        return max(1, (self.std_dev * self.vote_count + self.ppv *
-                       (self.voter_count - self.vote_count)) / self.voter_count)
+        return float(self.ballots.rstd[self.id])
+
+    @property
+    def histogram(self):
+        return self.ballots.histograms[self.id]
 
     @property
     def zscores(self):
-        real_votes = [x for x in self.votes if x != 26]
-        z = zscore(real_votes)
-        zscores = {}
-        for rank, score in zip(real_votes, z):
-            if rank not in zscores:
-                zscores[rank] = score
-        return zscores
+        return self.ballots.get_zscores(self.id)
 
 
 def get_vote_unusualness(rank, team):
@@ -123,7 +274,7 @@ def get_voter_differential(voter_ranking, teams, voter_count=60):
     diff = 0
     simple_diff = 0
     for pos, team_name in enumerate(voter_ranking):
-        target_team = [t for t in teams if t.name == team_name][0]
+        target_team = teams[team_name]
         diff += abs((target_team.points) - (voter_count * (25 - pos)))
         simple_diff += abs(min(26, target_team.rank) - (pos + 1))
 
@@ -131,8 +282,9 @@ def get_voter_differential(voter_ranking, teams, voter_count=60):
 
 
 def grade_voters(voters, teams):
+    by_name = {team.name: team for team in teams}
     for voter in voters:
-        diff, simple_diff = get_voter_differential(voter.rankings, teams,
+        diff, simple_diff = get_voter_differential(voter.rankings, by_name,
                                                voter_count=len(voters))
         voter.diff = diff
         voter.simple_diff = simple_diff
@@ -176,26 +328,15 @@ def th(text, **kwargs):
 
 
 def get_graphic_header(show_games=True):
-    s = ''
-    
-    s += '<tr>'
-    
-    s += th('Rk')
-    s += th('')
-    s += th('Team')
-    s += th('Points')
+    cells = ['<tr>', th('Rk'), th(''), th('Team'), th('Points')]
 
     if show_games:
-        s += th('Previous', left_border=True)
-        s += th('Next')
-
-    for n in range(1, 26):
-        s += th(n, left_border=n%5 == 1)
+        cells += [th('Previous', left_border=True), th('Next')]
 
-    s += th('U', left_border=True)
+    cells += [th(n, left_border=n%5 == 1) for n in range(1, 26)]
+    cells += [th('U', left_border=True), '</tr>\n']
 
-    s += '</tr>\n'
-    return s
+    return ''.join(cells)
 
 
 def get_game_description(game, team):
@@ -203,7 +344,8 @@ def get_game_description(game, team):
         return '<img src="../../../../resources/bye.svg">'
 
     r = ''
-    if game.away_team == CFBD.team_names.get(team, team):
+    team_id = TEAMS.get_id(team)
+    if TEAMS.get_id(game.away_team) == team_id:
         location = '<img src="../../../../resources/away.svg">'
         opponent_name = f'<img src="{CFBD.get_logo(game.home_team)}" title="{game.home_team}">'
     else:
@@ -213,8 +355,8 @@ def get_game_description(game, team):
     r += f'<div class="description">{location} {opponent_name}'
 
     if game.home_points is not None:
-        did_win = CFBD.team_names.get(team, team) == (game.home_team if game.home_points > game.away_points
-                           else game.away_team)
+        did_win = team_id == TEAMS.get_id(game.home_team if game.home_points > game.away_points
+                                          else game.away_team)
         result = 'W' if did_win else 'L'
         hi = max(game.home_points, game.away_points)
         lo = min(game.home_points, game.away_points)
@@ -225,82 +367,84 @@ def get_game_description(game, team):
     return r
 
 
-def create_graphic(voters, **kwargs):
+def render_graphic(voters, **kwargs):
+    '''
+    Yields the vote distribution table one row at a time, so it can be
+    joined into a string or written straight to a file.
+    '''
     logos = kwargs.get('logos', None)
     games = kwargs.get('games', None)
     show_games = kwargs.get('show_games', True)
 
-    s = '<table>' + get_graphic_header(show_games=show_games)
-    team_names = set([team for voter in voters for team in voter.rankings])
-    teams = [Team(team, voters) for team in team_names]
+    yield '<table>'
+    yield get_graphic_header(show_games=show_games)
 
-    for r, team in enumerate(sorted(teams, key=lambda t: t.points, reverse=True)):
-        rank = r + 1
-        if (rank % 5 == 0):
-            s += '<tr class="bottomborder">'
-        else:
-            s += '<tr>'
+    ballots = BallotMatrix(voters)
+    cell_voters = ballots.get_cell_voters()
 
-        s += td(rank)
-        s += td(f'<img src="{CFBD.get_logo(team.name)}" title="{team.name}">')
-        s += td(team.name)
-        s += td(team.points)
+    for r, team in enumerate(sorted(ballots.teams, key=lambda t: t.points, reverse=True)):
+        rank = r + 1
+        row = ['<tr class="bottomborder">' if rank % 5 == 0 else '<tr>',
+               td(rank),
+               td(f'<img src="{CFBD.get_logo(team.name)}" title="{team.name}">'),
+               td(team.name),
+               td(team.points)]
 
         if show_games:
-            s += td(get_game_description(games[team.name]['prev'], team.name),
-                    left_border=True)
-            s += td(get_game_description(games[team.name]['next'], team.name))
-
-        cells = [{'n': len([v for v in team.votes if v == p]),
-                  'voters': [v for v in voters if v.rankings[p-1] == team.name]
-                            if p != 26 else
-                            [v for v in voters if team.name not in v.rankings]}
-                 for p in range(1, 27)]
-        common = max(c['n'] for c in cells)
-        for n, cell in enumerate(cells):
-            cell['class'] = ''
-            cell['title'] = ''
+            row.append(td(get_game_description(games[team.name]['prev'], team.name),
+                          left_border=True))
+            row.append(td(get_game_description(games[team.name]['next'], team.name)))
+
+        histogram = team.histogram
+        common = max(histogram[1:])
+        for n in range(26):
+            cell = {'n': int(histogram[n + 1]), 'class': '', 'title': ''}
             if cell['n'] == 0:
                 cell['class'] = 'none'
             elif cell['n'] == 1:
                 cell['class'] = 'only'
-                cell['title'] = cell['voters'][0].name if len(cell['voters']) == 1 else ''
+                only = cell_voters[team.id][n + 1]
+                cell['title'] = only[0].name if len(only) == 1 else ''
             if cell['n'] == common:
                 cell['class'] = 'most'
             if n == r and n < 25:
                 cell['class'] = 'matches'
-            s += td(cell, True, left_border=n%5 == 0)
+            row.append(td(cell, True, left_border=n%5 == 0))
 
-        s += '</tr>\n'
+        row.append('</tr>\n')
+        yield ''.join(row)
 
-    s += '</table>'
+    yield '</table>'
 
-    return s
+
+def create_graphic(voters, **kwargs):
+    return ''.join(render_graphic(voters, **kwargs))
 
 
-def build_team_list(ballots):
-    teams = set([team for voter in voters for team in voter.rankings])
-    return [Team(team, voters) for team in teams]
+def build_team_list(voters):
+    return BallotMatrix(voters).teams
 
 
 def analyze_poll(voters, **kwargs):
     print_table = kwargs.get('print_table', True)
     print_comment = kwargs.get('print_comment', True)
     all_ballots = kwargs.get('all_ballots', None)
+    season = kwargs.get('season', None)
+    week = kwargs.get('week', None)
 
     s = ''
-    teams = set([team for voter in voters for team in voter.rankings])
-    team_name_len = max(len(t) for t in teams) + 2
-    team_list = [Team(team, voters) for team in teams]
+    ballots = BallotMatrix(voters)
+    team_name_len = max(len(t) for t in ballots.team_names) + 2
+    team_list = ballots.teams
     top25 = sorted(team_list, key=lambda t: t.points, reverse=True)[:25]
 
     for rank, t in enumerate(sorted(team_list, key=lambda x: x.points, reverse=True)):
-        t.rank = len([tm for tm in team_list if tm.points > t.points]) + 1
+        t.rank = int(ballots.poll_ranks[t.id])
 
         if print_table:
             s += f"{rank+1:>2d}. {t.name:<{team_name_len}s} ({t.ppv:>5.2f} / {t.rstd:>5.2f})  "
             for n in range(1, 27):
-                l = len([x for x in t.votes if x == n])
+                l = t.histogram[n]
                 l = '--' if l == 0 else f'{l:>2d}'
                 s += f'{l}'
                 if n%5 == 0:
@@ -309,29 +453,15 @@ def analyze_poll(voters, **kwargs):
 
     graded = grade_voters(voters, team_list)
 
-    votes = []
-    for rank, voter in enumerate(sorted(graded, key=lambda x: x.diff)):
-        for pos, team_name in enumerate(voter.rankings):
-            team = [t for t in team_list if t.name == team_name][0]
-            votes.append({
-                'voter': voter,
-                'position': pos+1,
-                'team': team,
-                'u': get_vote_unusualness(pos+1, team)
-                })
+    top25_ids = [team.id for team in top25]
+    for voter, score in zip(voters, ballots.get_unusualness_scores(top25_ids)):
+        voter.unusualness = float(score)
+    u_scores = {voter.name: voter.unusualness for voter in graded}
+    if season is not None:
+        season.add_week(week, voters)
 
-        for r, team in enumerate(top25):
-            if team.name not in voter.rankings:
-                u = get_exclusion_unusualness(team)
-                if u > 0:
-                    votes.append({
-                        'voter': voter,
-                        'position': 'NR',
-                        'team': team,
-                        'u': get_exclusion_unusualness(team)
-                        })
-    u_scores = {voter.name: voter.get_unusualness_score(team_list, top25)
-                for voter in graded}
+    order = sorted(range(len(voters)), key=lambda v: voters[v].diff)
+    votes = ballots.get_outliers(top25_ids, order)
 
     if print_comment:
         # Printing comment for Reddit
@@ -372,9 +502,7 @@ def analyze_poll(voters, **kwargs):
         s += '\n'
         s += (tabulate([[rank+1, vote['voter'].name, get_flaired_name(vote['team']),
                         vote['position'], vote['u']]
-                       for rank, vote in enumerate(sorted(votes, key=lambda x:
-                                                          abs(x['u']),
-                                                          reverse=True)[:5])],
+                       for rank, vote in enumerate(votes)],
                        ['Rank', 'Voter', 'Team', 'Position', 'Unusualness'],
                        tablefmt='pipe', floatfmt='5.2f'))
         s += '\n'
@@ -390,6 +518,8 @@ def analyze_poll(voters, **kwargs):
 
         if all_ballots:
             s += analyze_ballots_for_season(all_ballots)
+        elif season is not None:
+            s += analyze_season_totals(season.get_totals(week))
 
         s += ('\n^(Let me know if there are any other metrics or data points that'
         ' you think would be interesting to include!)')
@@ -406,19 +536,86 @@ def ppv_table(teams):
                    tablefmt='pipe')
 
 
+def get_ballot_digest(voters):
+    h = hashlib.sha1()
+    for voter in voters:
+        h.update(json.dumps(voter.to_csv()).encode())
+    return h.hexdigest()
+
+
+class SeasonAccumulator:
+    '''
+    Per-voter unusualness sums and ballot counts for each week of a season,
+    saved along with a digest of that week's ballots.  A new week only has
+    to analyze its own ballots, and a week whose ballots were rescraped or
+    corrected is noticed and analyzed again.
+    '''
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.weeks = {}
+        self.digests = {}
+        if exists(fp):
+            with open(fp, 'r') as infile:
+                data = json.load(infile)
+            # older files kept cumulative totals without digests, so they
+            # are rebuilt from scratch
+            if 'digests' in data:
+                self.weeks = {int(week): totals
+                              for week, totals in data['weeks'].items()}
+                self.digests = {int(week): digest
+                                for week, digest in data['digests'].items()}
+
+    def __contains__(self, week):
+        return week in self.weeks
+
+    def is_current(self, week, voters):
+        return self.digests.get(week, None) == get_ballot_digest(voters)
+
+    def get_totals(self, week):
+        totals = {}
+        for wk in sorted(self.weeks):
+            if wk > week:
+                break
+            for name, (u, count) in self.weeks[wk].items():
+                total = totals.setdefault(name, [0, 0])
+                total[0] += u
+                total[1] += count
+        return totals
+
+    def add_week(self, week, voters):
+        totals = {}
+        for voter in voters:
+            total = totals.setdefault(voter.name, [0, 0])
+            total[0] += voter.unusualness
+            total[1] += 1
+        self.weeks[week] = totals
+        self.digests[week] = get_ballot_digest(voters)
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.fp), exist_ok=True)
+        with open(self.fp, 'w') as outfile:
+            json.dump({'weeks': self.weeks, 'digests': self.digests}, outfile)
+
+
 def analyze_ballots_for_season(ballot_list, ratio = 0.5):
-    s = ''
-    voters = set([voter.name for voter in ballot_list])
+    totals = {}
+    for ballot in ballot_list:
+        total = totals.setdefault(ballot.name, [0, 0])
+        total[0] += ballot.unusualness
+        total[1] += 1
+    return analyze_season_totals(totals, ratio=ratio)
 
-    collections = [{'ballots': [b for b in ballot_list if b.name == voter],
-                    'voter': voter} for voter in voters]
 
-    for v in collections:
-        v['u'] = sum([b.unusualness for b in v['ballots']]) / len(v['ballots'])
+def analyze_season_totals(totals, ratio = 0.5):
+    s = ''
+    collections = [{'voter': voter, 'u': u / count, 'count': count}
+                   for voter, (u, count) in totals.items()]
 
-    qual = ratio * max(len(c['ballots']) for c in collections)
+    qual = ratio * max(c['count'] for c in collections)
     qualified = [c for c in collections
-                 if len(c['ballots']) >= qual]
+                 if c['count'] >= qual]
     s += ('\n-----')
     s += '\n'
     s += ('\nAnd some cumulative season stats:')
@@ -427,7 +624,7 @@ def analyze_ballots_for_season(ballot_list, ratio = 0.5):
     s += '\n'
     s += ("\n# Most Unusual Voters\n")
     s += '\n'
-    s += (tabulate([[rank+1, v['voter'], v['u'], len(v['ballots'])]
+    s += (tabulate([[rank+1, v['voter'], v['u'], v['count']]
                     for rank, v in enumerate(sorted(qualified, key=lambda v:
                                                     v['u'],
                                                     reverse=True)[:5])],
@@ -437,7 +634,7 @@ def analyze_ballots_for_season(ballot_list, ratio = 0.5):
 
     s += ("\n# Least Unusual Voters\n")
     s += '\n'
-    s += (tabulate([[rank+1, v['voter'], v['u'], len(v['ballots'])]
+    s += (tabulate([[rank+1, v['voter'], v['u'], v['count']]
                     for rank, v in enumerate(sorted(qualified, key=lambda v:
                                                     v['u'])[:5])],
                     ['Rank', 'Voter', 'Avg. Unusualness', 'Ballots'],
@@ -460,35 +657,19 @@ def get_condorcet_score(a, b, voters):
     return counts
 
 
+def get_majority_matrix(ballots):
+    '''
+    Pairwise majority results between every pair of teams: 1 if the row team
+    is ranked ahead of the column team on more ballots than the reverse, -1
+    if behind, 0 if tied.  A ranked team is ahead of every unranked team.
+    '''
+    ranks = ballots.ranks
+    ahead = (ranks[:, :, None] < ranks[:, None, :]).sum(axis=0)
+    return np.sign(ahead - ahead.T)
+
+
 def get_smith_set(rankings):
-    teams = list(set([t for b in rankings for t in b]))
-    rng = range(len(teams))
-    scores = [[0 for _ in teams] for _ in teams]
-    for ranking in rankings:
-        mask = [[0 for _ in teams] for _ in teams]
-        for team in ranking:
-            for i in rng:
-                if mask[teams.index(team)][i] == 0 and i != teams.index(team):
-                    mask[teams.index(team)][i] = 1
-                    mask[i][teams.index(team)] = -1
-        for r in rng:
-            for c in rng:
-                scores[r][c] += mask[r][c]
-
-    scores = [[(1 + max(min(s, 1), -1)) / 2 for s in r] for r in scores]
-#     print('\n'.join([' '.join(str(x) for x in row) for row in scores]))
-
-    hi = max(sum(scores[i]) for i in rng)
-    copeland = [r for r in rng if sum(scores[r]) == hi]
-    smith = []
-    while len(copeland) > 0:
-        smith += copeland
-        copeland = []
-        for n in smith:
-            copeland += [i for i in rng if scores[i][n] == 1 and i not in smith]
-        copeland = list(set(copeland))
-
-    return [teams[i] for i in smith]
+    return get_smith_sets([Voter('', '', ranking) for ranking in rankings])[0]
 
 
 def get_condorcet_score(a, b, rankings):
@@ -504,21 +685,49 @@ def get_condorcet_score(a, b, rankings):
 
 
 def get_smith_sets(voters):
+    '''
+    Splits the teams into tiers, each being the Smith set of the teams left
+    after removing the tiers above it.
+
+    Each tier is the set of teams that can reach a Copeland winner through a
+    chain of head-to-head wins.  Removing a tier never breaks such a chain
+    between the remaining teams, so the strongly connected components of the
+    win graph and their reachability are computed once and reused for every
+    tier.
+    '''
+    # scipy is slow to import and only needed here, so the scrapers and
+    # stores that import this module for Voter don't pay for it
+    from scipy import sparse
+    from scipy.sparse.csgraph import connected_components
+
+    ballots = BallotMatrix(voters)
+    majority = get_majority_matrix(ballots)
+    beats = majority > 0
+
+    component_count, components = connected_components(
+            sparse.csr_matrix(beats), directed=True, connection='strong')
+    winners, losers = np.nonzero(beats)
+    reaches = np.eye(component_count, dtype=bool)
+    reaches[components[winners], components[losers]] = True
+    for k in range(component_count):
+        reaches |= reaches[:, k:k+1] & reaches[k:k+1, :]
+
+    points = (1 + majority) / 2
+    remaining = np.ones(len(ballots.team_names), dtype=bool)
     smith_sets = []
-    rankings = [[x for x in voter.rankings] for voter in voters]
-    while any(len(ranking) > 0 for ranking in rankings):
-        smith_sets.append(get_smith_set(rankings))
-        rankings = [[x for x in r if x not in smith_sets[-1]] for r in rankings]
-#         for a in smith_sets[-1]:
-#             for b in smith_sets[-1][smith_sets[-1].index(a)+1:]:
-#                 scores = get_condorcet_score(a, b, [v.rankings for v in voters])
-#                 h = a if scores[a] >= scores[b] else b
-#                 l = a if h == b else b
-#                 print(f'{h:>25s}: {scores[h]:>2d} {l:>25s}: {scores[l]:>2d}')
+    while remaining.any():
+        copeland = np.where(remaining, points[:, remaining].sum(axis=1),
+                            -np.inf)
+        copeland_winners = components[copeland == copeland.max()]
+        tier = remaining & reaches[:, copeland_winners].any(axis=1)[components]
 
+        smith_sets.append([ballots.team_names[t]
+                           for t in sorted(np.nonzero(tier)[0],
+                                           key=lambda t: -copeland[t])])
+        remaining &= ~tier
 
     return smith_sets
-        
+
 
 if __name__ == '__main__':
 #     get_ap_poll_page.clear_cache()
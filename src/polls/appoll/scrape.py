@@ -1,43 +1,102 @@
-from polls.analysis import Voter, Team
-from bs4 import BeautifulSoup
-from tqdm import tqdm
+from polls.analysis import Voter
+from polls.parsing import parse_html, has_class
+from bs4 import SoupStrainer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import aiohttp
+import asyncio
 import requests
 import urllib
 
 
+parser = 'html.parser'
+concurrency = 8
+
+VOTER_LIST_REGION = SoupStrainer('select', {'name': 'Select-pollster-input'})
+RESULTS_REGION = SoupStrainer('div', class_=has_class('Results-container'))
+CPT_REGION = SoupStrainer('div', {'id': 'gridBallots'})
+
+
 # AP Poll
 
-def get_ap_poll_page(week=None, voter=None, org=None, league='football'):
+def get_ap_poll_url(week=None, voter=None, org=None, league='football'):
     url = f'https://apnews.com/hub/ap-top-25-college-{league}-poll'
     params = {}
+    if week:
+        params['week'] = week
     if voter:
         params['voter'] = voter
     if org:
         params['organization'] = org
 
-    response = requests.get(url, params=urllib.parse.urlencode(params, quote_via=urllib.parse.quote))
-    soup = BeautifulSoup(response.text, features='html.parser')
-    return soup
+    if len(params) == 0:
+        return url
+    return f'{url}?{urllib.parse.urlencode(params, quote_via=urllib.parse.quote)}'
+
 
+def parse_page(text, region=None):
+    return parse_html(text, backend=parser, region=region)
 
 
-def get_ap_poll_voters(week=None):
+def get_ap_poll_page(week=None, voter=None, org=None, league='football'):
+    response = requests.get(get_ap_poll_url(week=week, voter=voter, org=org,
+                                            league=league))
+    return parse_page(response.text)
 
+
+async def fetch_ap_poll_page(client, semaphore, **kwargs):
+    async with semaphore:
+        async with client.get(get_ap_poll_url(**kwargs)) as response:
+            response.raise_for_status()
+            return await response.text()
+
+
+async def get_ap_poll_voters_async(week=None, league='football', concurrency=8):
     '''
-    returns a list of voters in the given week's poll.  Voters are represented
-    by a Voter object.
+    Fetches the overall poll page, then every voter's page concurrently over
+    one connection pool with at most `concurrency` requests in flight.
+    Parsing happens in a thread pool so it doesn't block the event loop.
     '''
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector) as client:
+        with ThreadPoolExecutor() as pool:
+
+            async def get_rankings(voter):
+                text = await fetch_ap_poll_page(client, semaphore, week=week,
+                                                voter=voter.name,
+                                                org=voter.organization,
+                                                league=league)
+                return await loop.run_in_executor(
+                        pool, lambda: get_rankings_from_page(
+                            parse_page(text, region=RESULTS_REGION)))
+
+            text = await fetch_ap_poll_page(client, semaphore, week=week,
+                                            league=league)
+            overall = await loop.run_in_executor(pool, parse_page, text,
+                                                 VOTER_LIST_REGION)
+            voter_list = get_voter_list(overall)
+
+            rankings = await asyncio.gather(*[get_rankings(voter)
+                                              for voter in voter_list])
+
+    for voter, ranking in zip(voter_list, rankings):
+        voter.rankings = ranking
 
-    overall = get_ap_poll_page(week=week)
-    voter_list = get_voter_list(overall)
-    rankings = get_rankings_from_page(overall)
+    return voter_list
 
-    for voter in tqdm(voter_list):
-        voter.rankings = get_rankings_from_page(get_ap_poll_page(
-            week=week, voter=voter.name, org=voter.organization
-            ))
 
-    return voter_list
+def get_ap_poll_voters(week=None, league='football', concurrency=8):
+
+    '''
+    returns a list of voters in the given week's poll.  Voters are represented
+    by a Voter object.
+    '''
+
+    return asyncio.run(get_ap_poll_voters_async(week=week, league=league,
+                                                concurrency=concurrency))
 
 
 def get_voter_list(soup):
@@ -63,8 +122,7 @@ def get_college_poll_tracker_for_week(year, week, league='football'):
     week_text = 'pre-season' if week == 1 else f'week-{week}'
     cpt_url = f'https://collegepolltracker.com/{league}/grid/{year}/{week_text}'
     response = requests.get(cpt_url)
-    soup = BeautifulSoup(response.text, features='html.parser')
-    return soup
+    return parse_page(response.text, region=CPT_REGION)
 
 
 def get_voters_from_CPT(page):
@@ -82,9 +140,25 @@ def get_voter_from_row(row):
                  rankings)
 
 
+def get_current_season(league='football', today=None):
+    # football seasons start in August and are named for that year; basketball
+    # seasons start in November and are named for the year they end in
+    today = today or date.today()
+    if league == 'basketball':
+        return today.year + 1 if today.month >= 10 else today.year
+    return today.year if today.month >= 8 else today.year - 1
+
+
 def scrape_ballots_for_poll(year, week, source='CPT', league='football'):
     if source == 'AP':
-        return get_ap_poll_voters(week=week, league=league)
+        # apnews.com only has voter pages for the season in progress, so any
+        # other year would come back with this season's ballots
+        current = get_current_season(league)
+        if year != current:
+            raise ValueError(f'AP voter pages only cover the {current} season, '
+                             f'not {year}; use the CPT source for past seasons')
+        return get_ap_poll_voters(week=week, league=league,
+                                  concurrency=concurrency)
     elif source == 'CPT':
         page = get_college_poll_tracker_for_week(year, week, league=league)
         return get_voters_from_CPT(page)
@@ -0,0 +1,32 @@
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml
+    FAST_BUILDER = 'lxml'
+except ImportError:
+    FAST_BUILDER = 'html.parser'
+
+
+BACKENDS = ['html.parser', 'lxml', 'strained']
+
+
+def has_class(name):
+    # SoupStrainer compares the raw class attribute while parsing, so a plain
+    # class name would miss elements that have more than one class
+    return re.compile(rf'(^|\s){re.escape(name)}(\s|$)')
+
+
+def parse_html(text, backend='html.parser', region=None):
+    '''
+    Parses a scraped page.  The `html.parser` and `lxml` backends build the
+    whole document with that BeautifulSoup tree builder.  The `strained`
+    backend only builds the elements matched by `region` (or the whole page
+    if there is none), using lxml when it is installed.
+    '''
+    if backend == 'strained':
+        return BeautifulSoup(text, features=FAST_BUILDER, parse_only=region)
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown parser backend: {backend}')
+    return BeautifulSoup(text, features=backend)
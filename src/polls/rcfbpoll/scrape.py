@@ -1,34 +1,65 @@
 import os
 import re
 import csv
+from functools import lru_cache
 from tqdm import tqdm
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
 import urllib
-import requests
 from polls.analysis import Voter
+from polls.parsing import parse_html
+from polls.session import ScrapeSession
 
 
-def get_page_of_type_for_poll(page_type, poll_id, params):
+session = ScrapeSession()
+parser = 'html.parser'
+
+BALLOTS_REGION = SoupStrainer('table')
+VOTERS_REGION = SoupStrainer('div', {'id': 'main-voters'})
+
+
+def configure_session(**kwargs):
+    global session
+    session = ScrapeSession(**kwargs)
+
+
+def get_page_of_type_for_poll(page_type, poll_id, params, region=None):
     url = f'https://poll.redditcfb.com/poll/{page_type}/{poll_id}/'
     if page_type == 'ballots':
         url += '1'
 
-    response = requests.get(url, params=urllib.parse.urlencode(params, quote_via=urllib.parse.quote))
-    soup = BeautifulSoup(response.text, features='html.parser')
-    return soup
+    response = session.get(url, params=urllib.parse.urlencode(params, quote_via=urllib.parse.quote))
+    return parse_html(response.text, backend=parser, region=region)
 
 
-def get_ballot_page_for_poll(poll_id, page_number):
+def get_ballot_page_for_poll(poll_id, page_number, region=None):
     return get_page_of_type_for_poll('ballots', poll_id, {
         'page': page_number
-        })
+        }, region=region)
+
+
+@lru_cache(maxsize=None)
+def get_poll_index():
+    response = session.get('https://poll.redditcfb.com/poll/')
+    return parse_html(response.text, backend=parser)
+
+
+def get_polls_for_year(year):
+    '''
+    returns a (folder, poll id) pair for every poll listed for the given year
+    on the poll index page.
+    '''
+    table = get_poll_index().find('h3', text=year).find_next_sibling()
+    polls = []
+    for tr in table.find_all('tr')[2:]:
+        link = tr.find('a')
+        poll_id = link['href'].split('/')[-2]
+        match = re.match(r'Week (\d+)', link.text)
+        polls.append((match.group(1) if match else link.text, poll_id))
+    return polls
 
 
 def get_poll_id(year, week):
-    url = f'https://poll.redditcfb.com/poll/'
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, features='html.parser')
-    table = soup.find('h3', text=year).find_next_sibling()
+    table = get_poll_index().find('h3', text=year).find_next_sibling()
     link = table.find('a', text='Preseason' if week == 1 else f'Week {week}')
     return link['href'].split('/')[-2]
 
@@ -46,21 +77,8 @@ def scrape_polls_for_year(year):
     fp = f'../build/cfb/polls/rcfb/{year}'
     if not os.path.exists(fp):
         os.mkdir(fp)
-    url = f'https://poll.redditcfb.com/poll/'
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, features='html.parser')
-    table = soup.find('h3', text=year).find_next_sibling()
-    for tr in table.find_all('tr')[2:]:
-#         print(tr)
-        link = tr.find('a')
-        print(link.text)
-        poll_id = link['href'].split('/')[-2]
-        match = re.match(r'Week (\d+)', link.text)
-        if match:
-            folder = match.group(1)
-        else:
-            folder = link.text
-
+    for folder, poll_id in get_polls_for_year(year):
+        print(folder)
         fp = f'../build/cfb/polls/rcfb/{year}/{folder}'
         if not os.path.exists(fp):
             os.mkdir(fp)
@@ -74,20 +92,8 @@ def scrape_characteristics_for_year(year):
     fp = f'../build/cfb/polls/rcfb/{year}'
     if not os.path.exists(fp):
         os.mkdir(fp)
-    url = f'https://poll.redditcfb.com/poll/'
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, features='html.parser')
-    table = soup.find('h3', text=year).find_next_sibling()
-    for tr in table.find_all('tr')[2:]:
-        link = tr.find('a')
-        print(link.text)
-        poll_id = link['href'].split('/')[-2]
-        match = re.match(r'Week (\d+)', link.text)
-        if match:
-            folder = match.group(1)
-        else:
-            folder = link.text
-
+    for folder, poll_id in get_polls_for_year(year):
+        print(folder)
         fp = f'../build/cfb/polls/rcfb/{year}/{folder}'
         if not os.path.exists(fp):
             os.mkdir(fp)
@@ -99,15 +105,17 @@ def scrape_characteristics_for_year(year):
 def scrape_ballots_for_poll_by_id(poll_id, page_number=1):
     page = get_ballot_page_for_poll(poll_id, page_number)
 
-    b = []
-
     btn_text = '\n                    Go to page...\n                '
     page_list = page.find('button', text=btn_text).find_next_sibling()
     num_pages = len(page_list.find_all('li'))
 
-    for pn in tqdm(range(1, num_pages + 1)):
-        b += scrape_ballots_from_page(page)
-        page = get_ballot_page_for_poll(poll_id, pn + 1)
+    b = scrape_ballots_from_page(page)
+    pages = session.map(
+            lambda pn: scrape_ballots_from_page(
+                get_ballot_page_for_poll(poll_id, pn, region=BALLOTS_REGION)),
+            range(page_number + 1, num_pages + 1))
+    for ballots in tqdm(pages, total=num_pages - page_number):
+        b += ballots
 
     return b
 #     if is_last_page(page, page_number):
@@ -128,7 +136,7 @@ def get_characteristics_from_link(link):
 
 
 def scrape_characteristics(poll_id):
-    page = get_page_of_type_for_poll('voters', poll_id, {})
+    page = get_page_of_type_for_poll('voters', poll_id, {}, region=VOTERS_REGION)
     main_voters = page.find('div', {'id': 'main-voters'})
     return [[link.text.strip(), *get_characteristics_from_link(link)]
             for link in main_voters.find_all('a')]
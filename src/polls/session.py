@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import requests
+
+
+class ScrapeSession:
+    '''
+    A keep-alive HTTP session for the poll scrapers.  Requests are retried
+    with exponential backoff, spaced at least `min_interval` seconds apart
+    across all threads, and `map` fetches several pages at once with at most
+    `concurrency` requests in flight.
+    '''
+
+    def __init__(self, concurrency=4, min_interval=0.25, retries=3,
+                 backoff=0.5):
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+
+        retry = Retry(total=retries, backoff_factor=backoff,
+                      status_forcelist=[429, 500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=concurrency,
+                              pool_maxsize=concurrency, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._next_request = 0
+
+    def wait_turn(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_request - now
+            self._next_request = max(now, self._next_request) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        self.wait_turn()
+        response = self.session.get(url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def map(self, fn, items):
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            yield from pool.map(fn, items)
@@ -0,0 +1,174 @@
+from polls.analysis import Voter
+
+from csv import reader, writer
+import os
+
+import numpy as np
+
+
+class BallotStore:
+    '''
+    Every ballot for one poll, kept as flat binary columns in a single
+    directory so they can be memory-mapped instead of parsed.
+
+    Teams and voters are stored once in dictionary files and referenced by
+    integer id.  Each ballot is one row of the year, week and voter columns
+    plus a row of `SLOTS` team ids in `slots`, where the column is the rank
+    and `EMPTY` marks an unused slot.  Weeks are appended as a block, so each
+    (year, week) is a contiguous range of rows.
+    '''
+
+    SLOTS = 25
+    EMPTY = 0xFFFF
+
+    COLUMNS = {
+            'year': np.uint16,
+            'week': np.uint8,
+            'voter': np.uint32,
+            'slots': np.uint16,
+            }
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self.teams = []
+        if os.path.exists(self.path('teams.txt')):
+            with open(self.path('teams.txt'), 'r') as infile:
+                self.teams = infile.read().splitlines()
+        self.team_ids = {team: n for n, team in enumerate(self.teams)}
+
+        self.voters = []
+        if os.path.exists(self.path('voters.csv')):
+            with open(self.path('voters.csv'), 'r') as infile:
+                self.voters = [tuple(row) for row in reader(infile)]
+        self.voter_ids = {voter: n for n, voter in enumerate(self.voters)}
+
+        self.load()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def read_column(self, name):
+        fp = self.path(f'{name}.bin')
+        dtype = BallotStore.COLUMNS[name]
+        if not os.path.exists(fp) or os.path.getsize(fp) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(fp, dtype=dtype, mode='r')
+
+    def load(self):
+        self.year = self.read_column('year')
+        self.week = self.read_column('week')
+        self.voter = self.read_column('voter')
+        self.slots = self.read_column('slots').reshape(-1, BallotStore.SLOTS)
+
+        # one block of rows per (year, week), found where either column changes
+        starts = np.flatnonzero(np.diff(self.year.astype(int), prepend=-1) |
+                                np.diff(self.week.astype(int), prepend=-1))
+        stops = np.append(starts[1:], len(self.year))
+        self.index = {(int(self.year[a]), int(self.week[a])): (a, b)
+                      for a, b in zip(starts, stops)}
+
+    def __contains__(self, key):
+        return key in self.index
+
+    @property
+    def weeks(self):
+        return sorted(self.index.keys())
+
+    def get_team_id(self, team, new_teams):
+        if team not in self.team_ids:
+            self.team_ids[team] = len(self.teams)
+            self.teams.append(team)
+            new_teams.append(team)
+        return self.team_ids[team]
+
+    def get_voter_id(self, voter, new_voters):
+        key = (voter.name, voter.organization)
+        if key not in self.voter_ids:
+            self.voter_ids[key] = len(self.voters)
+            self.voters.append(key)
+            new_voters.append(key)
+        return self.voter_ids[key]
+
+    def append_week(self, year, week, voters):
+        if (year, week) in self.index:
+            return
+
+        new_teams = []
+        new_voters = []
+        slots = np.full((len(voters), BallotStore.SLOTS), BallotStore.EMPTY,
+                        dtype=np.uint16)
+        for v, voter in enumerate(voters):
+            ids = [self.get_team_id(team, new_teams)
+                   for team in voter.rankings[:BallotStore.SLOTS]]
+            slots[v, :len(ids)] = ids
+        voter_ids = [self.get_voter_id(voter, new_voters) for voter in voters]
+
+        # dictionaries first, so every id in the columns can be resolved
+        with open(self.path('teams.txt'), 'a') as outfile:
+            outfile.writelines(f'{team}\n' for team in new_teams)
+        with open(self.path('voters.csv'), 'a') as outfile:
+            writer(outfile).writerows(new_voters)
+
+        columns = {
+                'year': np.full(len(voters), year),
+                'week': np.full(len(voters), week),
+                'voter': np.array(voter_ids),
+                'slots': slots,
+                }
+        for name, values in columns.items():
+            with open(self.path(f'{name}.bin'), 'ab') as outfile:
+                outfile.write(values.astype(BallotStore.COLUMNS[name]).tobytes())
+
+        self.load()
+
+    def get_slots(self, year, week):
+        '''
+        The voter ids and (ballots x SLOTS) team ids for one week, as views
+        into the memory-mapped columns.
+        '''
+        start, stop = self.index.get((year, week), (0, 0))
+        return self.voter[start:stop], self.slots[start:stop]
+
+    def get_ballots(self, year, week):
+        voter_ids, slots = self.get_slots(year, week)
+        return [Voter(*self.voters[v],
+                      rankings=[self.teams[t] for t in row
+                                if t != BallotStore.EMPTY])
+                for v, row in zip(voter_ids, slots)]
+
+
+def get_voters_for_week(store, year, week, alt):
+    if (year, week) not in store:
+        store.append_week(year, week, alt())
+    return store.get_ballots(year, week)
+
+
+def import_csv_tree(root, store):
+    '''
+    Adds every {year}/{week}/raw.csv under `root` that isn't in the store
+    yet.  The preseason poll is week 1; other non-numeric weeks are skipped.
+    Returns the number of weeks added.
+    '''
+    found = []
+    for year in sorted(os.listdir(root)):
+        if not year.isdigit() or not os.path.isdir(os.path.join(root, year)):
+            continue
+        for week in os.listdir(os.path.join(root, year)):
+            fp = os.path.join(root, year, week, 'raw.csv')
+            week_number = 1 if week == 'Preseason' else week
+            if not str(week_number).isdigit() or not os.path.exists(fp):
+                continue
+            found.append((int(year), int(week_number), fp))
+
+    imported = 0
+    for year, week, fp in sorted(found):
+        if (year, week) in store:
+            continue
+        with open(fp, 'r') as infile:
+            store.append_week(year, week, [Voter.from_csv(line)
+                                           for line in reader(infile)])
+        imported += 1
+
+    return imported
@@ -1,25 +1,22 @@
-from core.authorize import create_client
-import cfbd
-
-client = create_client()
-
-games_api = cfbd.GamesApi(client)
+from core.cfbd import CFBD
 
 bluebloods = ['Michigan', 'Texas', 'USC', 'Nebraska',
               'Oklahoma', 'Ohio State', 'Alabama', 'Notre Dame']
 
 
-def calculate_blueblood_results(year, week, api_games=None):
+def calculate_blueblood_results(year, week, index=None):
     wins = []
     losses = []
     ties = []
-    if api_games is None:
-        games = games_api.get_games(year, week=week)
-    else:
-        games = [g for g in api_games if g.week == week]
+    if index is None:
+        index = CFBD.get_season_index(year)
+
+    games = {game.id: game
+             for game in [index.get_game(team, week) for team in bluebloods]
+             if game is not None}
 
-    for game in games:
-        if game.home_team not in bluebloods and game.away_team not in bluebloods:
+    for game in games.values():
+        if game.home_points is None:
             continue
 
         if game.home_team in bluebloods:
@@ -0,0 +1,87 @@
+from core.cfbd import CFBD
+from core.teams import TEAMS
+from results.bluebloods import bluebloods
+from results.records import get_games_for_years
+
+import numpy as np
+
+
+NO_GAME, WIN, LOSS, TIE = 0, 1, 2, 3
+
+OUTCOMES = ['-', 'W', 'L', 'T']
+
+
+def get_group(name):
+    '''
+    The teams in a named group: 'bluebloods' or the name of a conference,
+    using current conference membership.
+    '''
+    if name == 'bluebloods':
+        return bluebloods
+    return [t.school for t in CFBD.get_teams() if t.conference == name]
+
+
+class ResultsTable:
+    '''
+    One row per team per played game, with the year, week, TEAMS id and
+    outcome as integer columns, so results for any group of teams can be
+    picked out with array operations instead of walking the games again.
+    '''
+
+    def __init__(self, games):
+        played = [g for g in games if g.home_points is not None]
+        margins = np.array([g.home_points - g.away_points for g in played],
+                           dtype=np.int32)
+        home = np.where(margins > 0, WIN, np.where(margins < 0, LOSS, TIE))
+        away = np.where(margins > 0, LOSS, np.where(margins < 0, WIN, TIE))
+
+        self.year = np.tile([g.season for g in played], 2).astype(np.int32)
+        self.week = np.tile([g.week for g in played], 2).astype(np.int32)
+        self.team = np.array(TEAMS.get_ids([g.home_team for g in played] +
+                                           [g.away_team for g in played]),
+                             dtype=np.int32)
+        self.outcome = np.concatenate([home, away]).astype(np.int8)
+        self.game = np.tile(np.arange(len(played)), 2)
+
+    @staticmethod
+    def from_cfbd(years, division=None):
+        return ResultsTable(get_games_for_years(years, division=division))
+
+    def get_outcomes(self, teams, years, weeks):
+        '''
+        A (years x weeks x teams) array of NO_GAME/WIN/LOSS/TIE for each of
+        `teams`.  When a team played twice in a week its first game is used.
+        '''
+        years = np.asarray(years)
+        weeks = np.asarray(weeks)
+        team_ids = np.array(TEAMS.get_ids(teams), dtype=np.int32)
+
+        rows = np.flatnonzero(np.isin(self.team, team_ids) &
+                              np.isin(self.year, years) &
+                              np.isin(self.week, weeks))
+        rows = rows[np.argsort(self.game[rows], kind='stable')]
+        year_pos = {year: n for n, year in enumerate(years.tolist())}
+        week_pos = {week: n for n, week in enumerate(weeks.tolist())}
+        team_pos = {team: n for n, team in enumerate(team_ids.tolist())}
+
+        outcomes = np.full((len(years), len(weeks), len(teams)), NO_GAME,
+                           dtype=np.int8)
+        cells = np.ravel_multi_index(
+                (np.array([year_pos[y] for y in self.year[rows].tolist()], dtype=np.intp),
+                 np.array([week_pos[w] for w in self.week[rows].tolist()], dtype=np.intp),
+                 np.array([team_pos[t] for t in self.team[rows].tolist()], dtype=np.intp)),
+                outcomes.shape)
+        # rows are in game order, so the first row for each cell is the
+        # team's first game that week
+        cells, first = np.unique(cells, return_index=True)
+        outcomes.flat[cells] = self.outcome[rows[first]]
+        return outcomes
+
+
+def get_group_totals(outcomes):
+    '''
+    The number of wins, losses and ties for the group in each (year, week)
+    of an array from ResultsTable.get_outcomes.
+    '''
+    return ((outcomes == WIN).sum(axis=2), (outcomes == LOSS).sum(axis=2),
+            (outcomes == TIE).sum(axis=2))
@@ -0,0 +1,78 @@
+from core.cfbd import CFBD
+
+import numpy as np
+
+
+class RankingsHistory:
+    '''
+    Every (year, week, poll, school, rank) row of the polls for a range of
+    seasons, stored as numpy columns with polls and schools referenced by
+    index.  Rows are kept newest first, which is the order ties are broken
+    in when looking for a school's most recent ranking.
+    '''
+
+    def __init__(self, rows):
+        self.polls = sorted(set(row[2] for row in rows))
+        self.schools = sorted(set(row[3] for row in rows))
+        poll_ids = {poll: n for n, poll in enumerate(self.polls)}
+        school_ids = {school: n for n, school in enumerate(self.schools)}
+
+        self.year = np.array([row[0] for row in rows], dtype=np.int32)
+        self.week = np.array([row[1] for row in rows], dtype=np.int32)
+        self.poll = np.array([poll_ids[row[2]] for row in rows], dtype=np.int32)
+        self.school = np.array([school_ids[row[3]] for row in rows], dtype=np.int32)
+        self.rank = np.array([row[4] for row in rows], dtype=np.int32)
+
+    @staticmethod
+    def from_cfbd(first_season=2000, last_season=2024):
+        rows = []
+        for year in range(last_season, first_season - 1, -1):
+            for ranking in sorted(CFBD.get_rankings(year), key=lambda r: r.week,
+                                  reverse=True):
+                rows += [(year, ranking.week, poll.poll, rank.school, rank.rank)
+                         for poll in ranking.polls
+                         for rank in poll.ranks]
+        return RankingsHistory(rows)
+
+    @staticmethod
+    def from_warehouse(warehouse, first_season=2000, last_season=2024):
+        return RankingsHistory([
+                (row.season, row.week, row.poll, row.school, row.rank)
+                for row in warehouse.query(
+                        'SELECT * FROM rankings WHERE season BETWEEN ? AND ? '
+                        'ORDER BY season DESC, week DESC',
+                        first_season, last_season)])
+
+    def get_last_ranked(self, poll='AP Top 25'):
+        '''
+        For every minimum week W and school, the most recent (year, week,
+        rank) the school was ranked in a week numbered W or later, as three
+        (weeks x schools) arrays indexed by W.  Schools that were never
+        ranked in that span have a year of 0.
+
+        Each row gets a key that sorts by recency, the best key is found for
+        each exact (week, school), and a running max from the last week back
+        to week 0 extends that to every "week W or later".
+        '''
+        rows = np.flatnonzero(self.poll == self.polls.index(poll))
+        count = len(self.year)
+        keys = ((self.year[rows].astype(np.int64) * 64 + self.week[rows]) * count +
+                (count - 1 - rows))
+
+        best = np.full((self.week.max() + 1, len(self.schools)), -1, dtype=np.int64)
+        np.maximum.at(best, (self.week[rows], self.school[rows]), keys)
+        best = np.maximum.accumulate(best[::-1], axis=0)[::-1]
+
+        ranked = best >= 0
+        found = np.where(ranked, count - 1 - best % count, 0)
+        return (np.where(ranked, self.year[found], 0),
+                np.where(ranked, self.week[found], 0),
+                np.where(ranked, self.rank[found], 0))
+
+    def get_last_ranking(self, start_at=1, poll='AP Top 25', last_ranked=None):
+        years, weeks, ranks = last_ranked or self.get_last_ranked(poll)
+        if start_at >= len(years):
+            return {}
+        return {self.schools[s]: [int(years[start_at, s]), int(weeks[start_at, s]),
+                                  int(ranks[start_at, s])]
+                for s in np.flatnonzero(years[start_at])}
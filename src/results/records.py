@@ -0,0 +1,63 @@
+from core.cfbd import CFBD
+
+
+def get_games_for_years(years, division=None, played=True):
+    kwargs = {} if division is None else {'division': division}
+    return [g for year in years for g in CFBD.get_games(year, **kwargs)
+            if not played or g.home_points is not None]
+
+
+def get_records_before_games(games):
+    '''
+    Each team's [W, L, T] going into every game, counting only games from
+    earlier weeks of the same season.  Games are sorted by (season, week)
+    once and every team's record is carried forward a week at a time, so
+    any number of seasons takes a single pass.  Returns (game, home record,
+    away record) in the order the games were given.
+    '''
+    order = sorted(range(len(games)),
+                   key=lambda n: (games[n].season or 0, games[n].week))
+    before = [None] * len(games)
+    records = {}
+    season = None
+
+    start = 0
+    while start < len(order):
+        first = games[order[start]]
+        if first.season != season:
+            season = first.season
+            records = {}
+
+        stop = start
+        while (stop < len(order) and games[order[stop]].season == season and
+               games[order[stop]].week == first.week):
+            stop += 1
+        week = [order[n] for n in range(start, stop)]
+
+        # every game in the week sees the records from before it, so the
+        # week's results are only added once all of them have been read
+        for n in week:
+            game = games[n]
+            before[n] = (list(records.get(game.home_team, [0, 0, 0])),
+                         list(records.get(game.away_team, [0, 0, 0])))
+
+        for n in week:
+            game = games[n]
+            if game.home_points is None:
+                continue
+            margin = game.home_points - game.away_points
+            home = records.setdefault(game.home_team, [0, 0, 0])
+            away = records.setdefault(game.away_team, [0, 0, 0])
+            if margin > 0:
+                home[0] += 1
+                away[1] += 1
+            elif margin < 0:
+                home[1] += 1
+                away[0] += 1
+            else:
+                home[2] += 1
+                away[2] += 1
+
+        start = stop
+
+    return [(game, home, away) for game, (home, away) in zip(games, before)]
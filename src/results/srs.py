@@ -1,94 +1,170 @@
 from core.cfbd import CFBD
-from numpy import linalg
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import splu
 
 
 def avg(items):
     return sum(items) / len(items)
 
 
-def get_team_score(game, team):
-    return game.home_points if game.home_team == team else game.away_points
-
-
-def get_opponent_score(game, team):
-    return game.home_points if game.away_team == team else game.away_points
-
-
-def get_margin(game, team, min_margin=0, max_margin=999):
-    margin = get_team_score(game, team) - get_opponent_score(game, team)
-    adj_margin = max(min(abs(margin), max_margin), min_margin)
-    if margin > 0:
-        return adj_margin
-    elif margin < 0:
-        return -1 * adj_margin
+def encode_games(games, schools):
+    index = {school: n for n, school in enumerate(schools)}
+    fcs = index.get('fcs', -1)
+    encoded = [(index.get(g.home_team, fcs), index.get(g.away_team, fcs),
+                g.home_points - g.away_points)
+               for g in games if g.home_points is not None]
+
+    # games between two fcs teams, or involving fcs teams when they aren't
+    # included, don't tell us anything about the fbs teams
+    encoded = np.array([e for e in encoded
+                        if e[0] != e[1] and e[0] >= 0 and e[1] >= 0],
+                       dtype=np.int64).reshape(-1, 3)
+    return encoded[:, 0], encoded[:, 1], encoded[:, 2].astype(float)
+
+
+def clip_margins(margins, min_margin=0, max_margin=999):
+    return np.sign(margins) * np.clip(np.abs(margins), min_margin, max_margin)
+
+
+def get_margin_sums(home, away, margins, team_count):
+    return (np.bincount(home, weights=margins, minlength=team_count) -
+            np.bincount(away, weights=margins, minlength=team_count))
+
+
+def build_schedule_matrix(home, away, team_count):
+    '''
+    Builds the (games played - opponent counts) matrix for the SRS equations.
+
+    Every row sums to zero, so one row in each connected group of teams is
+    replaced with the constraint that the group's ratings average to zero.
+    Returns the sparse matrix and the indices of the replaced rows, whose
+    right-hand side must be set to zero.
+    '''
+    ones = np.ones(2 * len(home))
+    rows = np.concatenate([home, away])
+    cols = np.concatenate([away, home])
+    counts = sparse.coo_matrix((ones, (rows, cols)),
+                               shape=(team_count, team_count)).tocsr()
+    played = np.asarray(counts.sum(axis=1)).ravel()
+    matrix = (sparse.diags(played) - counts).tocoo()
+
+    _, groups = connected_components(counts, directed=False)
+    _, pinned = np.unique(groups, return_index=True)
+
+    keep = ~np.isin(matrix.row, pinned)
+    team_ids = np.arange(team_count)
+    matrix = sparse.coo_matrix(
+            (np.concatenate([matrix.data[keep], np.ones(team_count)]),
+             (np.concatenate([matrix.row[keep], pinned[groups]]),
+              np.concatenate([matrix.col[keep], team_ids]))),
+            shape=(team_count, team_count))
+
+    return matrix.tocsc(), pinned
+
+
+def solve_srs(home, away, margins, team_count, variants):
+    '''
+    Solves the SRS equations for every (min_margin, max_margin) variant at
+    once.  Only the right-hand side depends on the margins, so the schedule
+    matrix is factored a single time and each variant is one column.
+    '''
+    matrix, pinned = build_schedule_matrix(home, away, team_count)
+    const = np.column_stack([
+        get_margin_sums(home, away, clip_margins(margins, lo, hi), team_count)
+        for lo, hi in variants])
+    const[pinned, :] = 0
+    return splu(matrix).solve(const)
+
+
+def get_srs_variants(year, variants, include_fcs=True, normalized=False,
+                     warehouse=None):
+    if warehouse is None:
+        games = CFBD.get_games(year)
+        schools = [team.school for team in CFBD.get_fbs_teams(year=year)]
     else:
-        return 0
-
-
-def get_opponent(game, team):
-    return game.home_team if game.away_team == team else game.away_team
-
-
-def are_different(r1, r2, delta=0.001):
-    return any(abs(r1[s] - r2[s]) > delta for s in r1.keys())
-
-
-def should_include(game, include_fcs):
-    if game.home_points is None:
-        return False
-    if include_fcs:
-        return game.home_team != 'fcs' or game.away_team != 'fcs'
-    else:
-        return game.home_team != 'fcs' and game.away_team != 'fcs'
-
-
-def get_srs(year, min_margin=0, max_margin=999, max_iter=9999,
-            include_fcs=True, normalized=False):
-    games = CFBD.get_games(year)
-    teams = CFBD.get_fbs_teams()
-    schools = [team.school for team in teams]
+        games = warehouse.get_games(year)
+        schools = warehouse.get_fbs_schools(year)
     if include_fcs:
         schools += ['fcs']
 
-    for game in games:
-        if game.away_team not in schools:
-            game.away_team = 'fcs'
-        if game.home_team not in schools:
-            game.home_team = 'fcs'
-    games = [g for g in games if should_include(g, include_fcs)]
-
-    team_games = {school: [g for g in games
-                           if ((g.home_team == school or
-                                g.away_team == school))]
-                  for school in schools}
-    opponents = {school: [get_opponent(game, school)
-                          for game in team_games[school]]
-                 for school in schools}
+    home, away, margins = encode_games(games, schools)
+    ratings = solve_srs(home, away, margins, len(schools), variants)
 
-    margins = {school: avg([get_margin(game, school, min_margin=min_margin,
-                                       max_margin=max_margin)
-                           for game in team_games[school]])
-               for school in schools}
-
-    # linalg solution
-
-    coeff = [[len([x for x in opponents[school] if s == x]) for s in schools]
-             for school in schools]
-    for r, row in enumerate(coeff):
-        total = sum(row)
-        for i in range(len(row)):
-            row[i] = row[i] / total
-        row[r] = -1
+    if normalized:
+        ratings = ratings - ratings.mean(axis=0)
 
-    const = [-1*margins[school] for school in schools]
+    return {schools[n]: list(ratings[n]) for n in range(len(schools))}
 
-    ratings = linalg.solve(coeff, const)
 
-    if normalized:
-        xbar = sum(ratings) / len(ratings)
-        ratings = [r - xbar for r in ratings]
+def get_srs(year, min_margin=0, max_margin=999, max_iter=9999,
+            include_fcs=True, normalized=False, warehouse=None):
+    ratings = get_srs_variants(year, [(min_margin, max_margin)],
+                               include_fcs=include_fcs, normalized=normalized,
+                               warehouse=warehouse)
+    return {school: r[0] for school, r in ratings.items()}
+
+def get_srs_for_year(year, variants, include_fcs=True, normalized=False):
+    return year, get_srs_variants(year, variants, include_fcs=include_fcs,
+                                  normalized=normalized)
+
+
+def get_srs_for_years(years, variants, workers=None, include_fcs=True,
+                      normalized=False):
+    '''
+    Computes SRS variants for several seasons in a pool of worker processes,
+    yielding (year, ratings) pairs as each season finishes.
+    '''
+    # each worker builds its own client, so none of them share a connection
+    # the parent left open before forking
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=CFBD.reset_client) as pool:
+        futures = [pool.submit(get_srs_for_year, year, variants,
+                               include_fcs=include_fcs, normalized=normalized)
+                   for year in years]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def save_srs_history(fp, results, variants):
+    '''
+    Writes (year, team, variant, rating) columns for every season in
+    `results` to a single compressed numpy archive.  Team names and variants
+    are stored once and referenced by index.
+    '''
+    teams = sorted(set(team for _, ratings in results for team in ratings))
+    team_ids = {team: n for n, team in enumerate(teams)}
+
+    rows = [(year, team_ids[team], v, rating)
+            for year, ratings in results
+            for team, values in ratings.items()
+            for v, rating in enumerate(values)]
+    years, team_col, variant_col, rating_col = (zip(*rows) if len(rows) > 0
+                                                else ([], [], [], []))
+
+    os.makedirs(os.path.dirname(fp) or '.', exist_ok=True)
+    np.savez_compressed(fp,
+                        year=np.array(years, dtype=np.int16),
+                        team=np.array(team_col, dtype=np.int32),
+                        variant=np.array(variant_col, dtype=np.int16),
+                        rating=np.array(rating_col, dtype=np.float32),
+                        teams=np.array(teams),
+                        variants=np.array(variants, dtype=np.int32))
+
+
+def load_srs_history(fp):
+    with np.load(fp) as data:
+        teams = data['teams']
+        variants = [tuple(int(x) for x in v) for v in data['variants']]
+        return [(int(year), str(teams[team]), variants[variant], float(rating))
+                for year, team, variant, rating in zip(data['year'],
+                                                      data['team'],
+                                                      data['variant'],
+                                                      data['rating'])]
 
-    return {schools[n]: ratings[n] for n in range(len(ratings))}
 
 #     ratings = margins.copy()
 #     print(margins)
@@ -0,0 +1,160 @@
+from core.cfbd import CFBD
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+import numpy as np
+
+
+ARCHIVE_DIR = '../build/winprob'
+
+# per-game columns, then per-play columns; each is stored as its own .npy
+# array, one after the other in the same file
+GAME_COLUMNS = ['game_id', 'offset', 'home', 'away', 'home_score', 'away_score']
+PLAY_COLUMNS = ['play', 'seconds', 'home_wp', 'spread']
+
+
+def get_archive_path(year):
+    return os.path.join(ARCHIVE_DIR, f'{year}.wp')
+
+
+def read_segments(fp):
+    segments = []
+    size = os.path.getsize(fp)
+    with open(fp, 'rb') as infile:
+        while infile.tell() < size:
+            version = np.lib.format.read_magic(infile)
+            if version == (1, 0):
+                shape, _, dtype = np.lib.format.read_array_header_1_0(infile)
+            else:
+                shape, _, dtype = np.lib.format.read_array_header_2_0(infile)
+            offset = infile.tell()
+            count = int(np.prod(shape))
+            segments.append(np.memmap(fp, dtype=dtype, mode='r', offset=offset,
+                                      shape=shape) if count > 0 else
+                            np.zeros(shape, dtype=dtype))
+            infile.seek(offset + count * dtype.itemsize)
+    return segments
+
+
+class WinProbArchive:
+    '''
+    The play-by-play win probability series for a season of games, kept in
+    a single file of flat arrays that are memory-mapped when it is opened.
+    Plays for every game are concatenated, and `offset[n]:offset[n + 1]` is
+    the range of plays for `game_id[n]`.
+    '''
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.fp):
+            segments = read_segments(self.fp)
+        else:
+            segments = ([np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64),
+                         np.zeros(0, dtype='U1'), np.zeros(0, dtype='U1'),
+                         np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)] +
+                        [np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32),
+                         np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)])
+        for name, segment in zip(GAME_COLUMNS + PLAY_COLUMNS, segments):
+            setattr(self, name, segment)
+        self.index = {int(game_id): n for n, game_id in enumerate(self.game_id)}
+
+    def __contains__(self, game_id):
+        return int(game_id) in self.index
+
+    def __len__(self):
+        return len(self.game_id)
+
+    def get_range(self, game_id):
+        n = self.index[int(game_id)]
+        return self.offset[n], self.offset[n + 1]
+
+    def get_series(self, game_id):
+        '''
+        Views of the play, seconds remaining, home win probability and
+        spread arrays for one game.
+        '''
+        start, stop = self.get_range(game_id)
+        return (self.play[start:stop], self.seconds[start:stop],
+                self.home_wp[start:stop], self.spread[start:stop])
+
+    def get_title(self, game_id):
+        n = self.index[int(game_id)]
+        return (f'{self.away[n]} {self.away_score[n]} @ '
+                f'{self.home[n]} {self.home_score[n]}')
+
+    def add_games(self, wp_data):
+        '''
+        Rewrites the archive with the games in `wp_data` (game id -> list of
+        PlayWP) added to the ones already in it.
+        '''
+        games = {game_id: plays for game_id, plays in wp_data.items()
+                 if len(plays) > 0}
+        keep = [n for n, game_id in enumerate(self.game_id.tolist())
+                if game_id not in games]
+        kept_rows = np.concatenate([np.arange(self.offset[n], self.offset[n + 1])
+                                    for n in keep] + [np.zeros(0, dtype=np.int64)])
+
+        plays = [p for game in games.values() for p in game]
+        lengths = (np.diff(self.offset)[keep].tolist() +
+                   [len(game) for game in games.values()])
+        last = [game[-1] for game in games.values()]
+
+        columns = {
+                'game_id': np.concatenate([self.game_id[keep], list(games.keys())]),
+                'offset': np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]),
+                'home': np.concatenate([self.home[keep], [p.home or '' for p in last]]),
+                'away': np.concatenate([self.away[keep], [p.away or '' for p in last]]),
+                'home_score': np.concatenate([self.home_score[keep],
+                                              [p.home_score or 0 for p in last]]),
+                'away_score': np.concatenate([self.away_score[keep],
+                                              [p.away_score or 0 for p in last]]),
+                'play': np.concatenate([self.play[kept_rows],
+                                        [-1 if p.play_number is None else p.play_number
+                                         for p in plays]]),
+                'seconds': np.concatenate([self.seconds[kept_rows],
+                                           [-1 if p.time_remaining is None else p.time_remaining
+                                            for p in plays]]),
+                'home_wp': np.concatenate([self.home_wp[kept_rows],
+                                           [np.nan if p.home_win_prob is None else p.home_win_prob
+                                            for p in plays]]),
+                'spread': np.concatenate([self.spread[kept_rows],
+                                          [np.nan if p.spread is None else p.spread
+                                           for p in plays]]),
+                }
+        dtypes = {'game_id': np.int64, 'offset': np.int64, 'home_score': np.int32,
+                  'away_score': np.int32, 'play': np.int32, 'seconds': np.int32,
+                  'home_wp': np.float32, 'spread': np.float32}
+
+        os.makedirs(os.path.dirname(self.fp) or '.', exist_ok=True)
+        tmp = f'{self.fp}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as outfile:
+            for name in GAME_COLUMNS + PLAY_COLUMNS:
+                column = columns[name]
+                if name in dtypes:
+                    column = column.astype(dtypes[name])
+                np.save(outfile, column)
+        os.replace(tmp, self.fp)
+        self.load()
+
+
+def fetch_win_probabilities(game_ids, concurrency=8):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        yield from zip(game_ids, pool.map(CFBD.get_win_probability_data, game_ids))
+
+
+def archive_season(year, division='fbs', concurrency=8):
+    '''
+    Adds every played game of a season that isn't archived yet, fetching
+    their win probability data in a pool of threads.
+    '''
+    archive = WinProbArchive(get_archive_path(year))
+    game_ids = [g.id for g in CFBD.get_games(year, division=division)
+                if g.completed and g.id not in archive]
+    wp_data = dict(fetch_win_probabilities(game_ids, concurrency))
+    if len(wp_data) > 0:
+        archive.add_games(wp_data)
+    return archive, len(wp_data)
@@ -1,25 +1,96 @@
-import matplotlib.pyplot as plt
+from core.cfbd import CFBD
+from winprob.archive import fetch_win_probabilities
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import numpy as np
-from math import floor
-import cfbd
-from core.authorize import create_client
-
-
-def chart_game(game_id):
-    client = create_client()
-    metrics = cfbd.MetricsApi(client)
-    wp_data = metrics.get_win_probability_data(game_id)
-
-    x = np.linspace(0, 4, len(wp_data))
-    y = [point.home_win_prob for point in wp_data]
-    
-    plt.figure()
-    plt.plot(x, y)
-
-    plt.plot(np.linspace(0, 4, 2), [0.5, 0.5])
-    plt.axis([0, 4, 0, 1])
-    plt.xticks([])
-    plt.show()
+
+
+CHART_DIR = '../build/cfb/winprob'
+
+# each worker process draws every chart on the same figure
+_chart = None
+
+
+def get_chart():
+    global _chart
+    if _chart is None:
+        figure = Figure()
+        FigureCanvasAgg(figure)
+        ax = figure.add_subplot()
+        line, = ax.plot([], [])
+        ax.plot(np.linspace(0, 4, 2), [0.5, 0.5])
+        ax.axis([0, 4, 0, 1])
+        ax.set_xticks([])
+        _chart = (figure, ax, line)
+    return _chart
+
+
+def get_title(wp_data):
+    if len(wp_data) == 0:
+        return ''
+    last = wp_data[-1]
+    return f'{last.away} {last.away_score} @ {last.home} {last.home_score}'
+
+
+def render_chart(game_id, home_win_probs, fp, title=''):
+    figure, ax, line = get_chart()
+    line.set_data(np.linspace(0, 4, len(home_win_probs)), home_win_probs)
+    ax.set_title(title)
+
+    os.makedirs(os.path.dirname(fp), exist_ok=True)
+    figure.savefig(fp)
+    return game_id, fp
+
+
+def chart_game(game_id, fp=None, fmt='png'):
+    wp_data = CFBD.get_win_probability_data(game_id)
+    if fp is None:
+        fp = os.path.join(CHART_DIR, f'{game_id}.{fmt}')
+    return render_chart(game_id, [point.home_win_prob for point in wp_data], fp,
+                        get_title(wp_data))
+
+
+def get_slate(year, week, division='fbs'):
+    '''
+    Every finished game of a week.  Scores come from the one-minute live
+    cache rather than the six-hour games cache, and win probability data is
+    cached for a minute too, so a chart drawn right after a game ends uses
+    data at most a minute old.
+    '''
+    return [g.id for g in CFBD.get_games_live(year, week=week, division=division)
+            if g.completed]
+
+
+def chart_games(game_ids, directory=CHART_DIR, fmt='png', workers=None,
+                concurrency=8, archive=None):
+    '''
+    Charts several games at once: games in `archive` are drawn from its
+    arrays, the rest have their win probability data fetched in a pool of
+    threads, and each chart is drawn in a pool of worker processes as soon
+    as its data is ready.  Yields (game id, file) as charts are written.
+    '''
+    archived = [] if archive is None else [g for g in game_ids if g in archive]
+    missing = [g for g in game_ids if g not in archived]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_chart, game_id, np.asarray(archive.get_series(game_id)[2]),
+                               os.path.join(directory, f'{game_id}.{fmt}'),
+                               archive.get_title(game_id))
+                   for game_id in archived]
+        futures += [pool.submit(render_chart, game_id,
+                                [point.home_win_prob for point in wp_data],
+                                os.path.join(directory, f'{game_id}.{fmt}'),
+                                get_title(wp_data))
+                    for game_id, wp_data in fetch_win_probabilities(missing, concurrency)
+                    if len(wp_data) > 0]
+        for future in futures:
+            yield future.result()
 
 
 def main():
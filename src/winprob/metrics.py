@@ -0,0 +1,74 @@
+from winprob.archive import WinProbArchive, get_archive_path
+
+import numpy as np
+
+
+METRICS = ['excitement', 'changes', 'comeback', 'control']
+
+
+def get_game_metrics(archive):
+    '''
+    Per-game metrics over every game in an archive, computed on the
+    concatenated win probability arrays with reduceat at each game's first
+    play rather than by looping over plays.
+
+    excitement: total movement of the home win probability
+    changes: number of times the favorite switched sides of 50%
+    comeback: how far the eventual winner's win probability fell below 100%
+    control: the winner's average win probability over the game
+    '''
+    wp = np.asarray(archive.home_wp, dtype=np.float64)
+    lengths = np.diff(archive.offset)
+    games = np.repeat(np.arange(len(lengths)), lengths)
+
+    # plays without a win probability are dropped before the games are cut
+    # back into segments
+    valid = ~np.isnan(wp)
+    wp = wp[valid]
+    lengths = np.bincount(games[valid], minlength=len(lengths))
+    played = lengths > 0
+    if not played.any():
+        return {'game_id': np.zeros(0, dtype=np.int64), 'title': [],
+                **{name: np.zeros(0) for name in METRICS}}
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])[played]
+    first = np.zeros(len(wp), dtype=bool)
+    first[starts] = True
+
+    moves = np.abs(np.diff(wp, prepend=0))
+    moves[first] = 0
+    favorite = wp > 0.5
+    switches = favorite != np.roll(favorite, 1)
+    switches[first] = False
+
+    last = wp[np.cumsum(lengths)[played] - 1]
+    home_score = np.asarray(archive.home_score)[played]
+    away_score = np.asarray(archive.away_score)[played]
+    home_won = np.where(home_score != away_score, home_score > away_score, last > 0.5)
+
+    winner_low = np.where(home_won, np.minimum.reduceat(wp, starts),
+                          1 - np.maximum.reduceat(wp, starts))
+    home_mean = np.add.reduceat(wp, starts) / lengths[played]
+
+    return {
+            'game_id': np.asarray(archive.game_id)[played],
+            'title': [archive.get_title(g) for g in np.asarray(archive.game_id)[played]],
+            'excitement': np.add.reduceat(moves, starts),
+            'changes': np.add.reduceat(switches.astype(np.int32), starts),
+            'comeback': 1 - winner_low,
+            'control': np.where(home_won, home_mean, 1 - home_mean),
+            }
+
+
+def get_metrics_for_years(years):
+    columns = [get_game_metrics(WinProbArchive(get_archive_path(year)))
+               for year in years]
+    return {name: (sum((c[name] for c in columns), []) if name == 'title' else
+                   np.concatenate([c[name] for c in columns]))
+            for name in ['game_id', 'title'] + METRICS}
+
+
+def rank_games(metrics, by='excitement', count=25, reverse=True):
+    order = np.argsort(metrics[by], kind='stable')
+    if reverse:
+        order = order[::-1]
+    return [{name: metrics[name][n] for name in metrics} for n in order[:count]]
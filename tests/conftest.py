@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the scripts are run from src/ and import their packages from there
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
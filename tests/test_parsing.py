@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from polls.appoll import scrape as ap
+from polls.parsing import BACKENDS, parse_html
+from polls.rcfbpoll import scrape as rcfb
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r') as infile:
+        return infile.read()
+
+
+def voter_rows(voters):
+    return [voter.to_csv() for voter in voters]
+
+
+class FakeResponse:
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeSession:
+
+    def __init__(self, text):
+        self.text = text
+
+    def get(self, url, **kwargs):
+        return FakeResponse(self.text)
+
+
+def get_voters_from_CPT(backend):
+    page = parse_html(read_fixture('cpt_grid.html'), backend=backend,
+                      region=ap.CPT_REGION)
+    return voter_rows(ap.get_voters_from_CPT(page))
+
+
+def get_voter_list(backend):
+    page = parse_html(read_fixture('ap_poll.html'), backend=backend,
+                      region=ap.VOTER_LIST_REGION)
+    return voter_rows(ap.get_voter_list(page))
+
+
+def get_rankings_from_page(backend):
+    page = parse_html(read_fixture('ap_poll.html'), backend=backend,
+                      region=ap.RESULTS_REGION)
+    return ap.get_rankings_from_page(page)
+
+
+def scrape_ballots_from_page(backend):
+    page = parse_html(read_fixture('rcfb_ballots.html'), backend=backend,
+                      region=rcfb.BALLOTS_REGION)
+    return voter_rows(rcfb.scrape_ballots_from_page(page))
+
+
+def scrape_characteristics(backend, monkeypatch):
+    monkeypatch.setattr(rcfb, 'parser', backend)
+    monkeypatch.setattr(rcfb, 'session', FakeSession(read_fixture('rcfb_voters.html')))
+    return rcfb.scrape_characteristics('1')
+
+
+EXPECTED = {
+        get_voters_from_CPT: [
+            ['Jane Doe', 'Daily Planet', 'Texas', 'Ohio State', 'Texas A&M'],
+            ['John Smith', 'The Gazette', 'Ohio State', 'Texas', 'Miami'],
+            ],
+        get_voter_list: [
+            ['Jane Doe', 'Daily Planet'],
+            ['John Smith', 'The Gazette, Metropolis'],
+            ],
+        get_rankings_from_page: ['Texas', 'Ohio State', 'Texas A&M'],
+        scrape_ballots_from_page: [
+            ['alice', 'reddit', 'Texas', 'Texas A&M'],
+            ['bob', 'reddit', 'Ohio State', 'Miami'],
+            ],
+        }
+
+
+@pytest.mark.parametrize('extract', list(EXPECTED), ids=lambda fn: fn.__name__)
+def test_backends_agree(extract):
+    results = {backend: extract(backend) for backend in BACKENDS}
+    assert results == {backend: EXPECTED[extract] for backend in BACKENDS}
+
+
+def test_characteristics_backends_agree(monkeypatch):
+    results = {backend: scrape_characteristics(backend, monkeypatch)
+               for backend in BACKENDS}
+    expected = [['alice', 'HUMAN', True], ['bob', 'COMPUTER', False],
+                ['carol', 'HYBRID', True], ['dave', None, None]]
+    assert results == {backend: expected for backend in BACKENDS}